@@ -2,15 +2,35 @@ import sys
 import os
 import json
 import re
+import argparse
+import threading
 from datetime import datetime
+from collections import defaultdict
+from multiprocessing import Pool
 import importlib.util
 
+from evalyx_engine import run_pipeline
+from extraction_store import EXTRACTION_FILE, EXTRACTION_LOG, extraction_source, iter_tests, append_test
+from test_index import normalize_tid
+from output_writer import OutputWriter, DEFAULT_MANIFEST, write_atomic
+from ingest_cache import ParseCache, file_digest
+from evalyx_db import DB_FILE, DbWriter, connect, known_psids, add_test, upsert_results, export_tree, \
+    iter_extraction as iter_db_extraction
+
 # Configuration
 STUDENTS_DIR = os.path.join('public', 'api', 'students')
 
+# Per-thread extra log destination; ingest_worker points it at the current job's status
+_log_local = threading.local()
+
 def log(msg):
     print(msg)
     sys.stdout.flush()
+    sink = getattr(_log_local, "sink", None)
+    if sink: sink(msg)
+
+def set_log_sink(sink):
+    _log_local.sink = sink
 
 def check_dependencies():
     # Check for pdfplumber
@@ -18,186 +38,386 @@ def check_dependencies():
         log("ERROR: 'pdfplumber' library not found. Please run: pip install pdfplumber")
         sys.exit(1)
 
-def parse_pdf(pdf_path):
+# Bump when parsing changes so cached extractions of earlier versions are not reused
+PARSER_VERSION = 3
+
+# table: pdfplumber table detection, the default
+# text: the page's text layer parsed line by line with TEXT_ROW, about 1.3x faster on the shipped
+# sheets. Opt-in: it leaves out absentees and rows wrapped onto two lines, so check a new sheet
+# layout with --validate against table mode before relying on it
+PARSE_MODES = ("table", "text")
+
+# Header keywords per field, in priority order (first keyword found in any header wins)
+COLUMN_KEYWORDS = {
+    "psid": ["psid", "roll", "id"],
+    "physics": ["phys", "phy"],
+    "chemistry": ["chem", "che"],
+    "botany": ["bot"],
+    "zoology": ["zoo"],
+    "total": ["total", "score", "marks"],
+}
+SUBJECT_FIELDS = ["physics", "chemistry", "botany", "zoology"]
+NON_NUMERIC = re.compile(r'[^\d.]')
+
+# One student row of the Aakash result sheets as it appears in the text layer. Two layouts ship:
+#   <sno> <psid> <roll no> <section> <phy> <che> <bot> <zoo> <total> <%age> <percentile> <rank> <rank> <rank>
+#   <sno> <name> <psid> <roll no> <section> <phy> <che> <bot> <zoo> <total> <center rank>
+# The three rank columns are "Center Rank, State Rank, AIR" on sheets whose header has a State
+# Rank column and "Center Rank, AIR, Ranking" on the others (see parse_text). Subject marks are
+# at most three digits (negative marking allowed); rows are rejected unless the subjects add up
+# to the total. A row the sheet wraps onto two lines does not match and is left out.
+_MARK = r'(-?\d{1,3}(?:\.\d+)?)'
+_DECIMAL = r'-?\d+(?:\.\d+)?'
+TEXT_ROW = re.compile(
+    r'^\s*\d+\s+(?:(?P<name>.*?)\s+)?(?P<psid>\d{6,12})\s+(?P<roll>\d{6,12})\s+(?P<section>\S+)'
+    r'\s+' + r'\s+'.join([_MARK] * 4) + r'\s+(?P<total>-?\d{1,4}(?:\.\d+)?)'
+    r'(?:\s+(?P<pct>' + _DECIMAL + r')\s+(?P<percentile>' + _DECIMAL + r')\s+(?P<rank1>\d+)\s+(?P<rank2>\d+)\s+(?P<rank3>\d+)'
+    r'|\s+(?P<center_rank>\d+))\s*$'
+)
+
+def find_header(table):
+    # Heuristic: the header row names a PSID/roll column and at least one subject
+    for i, row in enumerate(table):
+        clean_row = [str(c).lower().strip() if c else "" for c in row]
+        if any("psid" in c or "roll" in c for c in clean_row) and \
+           any("phy" in c or "che" in c for c in clean_row):
+            return i, clean_row
+    return -1, []
+
+def resolve_columns(headers):
+    # Field -> column index, resolved once per table and reused for all of its rows
+    columns = {}
+    for field, keywords in COLUMN_KEYWORDS.items():
+        columns[field] = next((i for k in keywords for i, h in enumerate(headers) if k in h), -1)
+    return columns
+
+def parse_table(table):
+    header_idx, headers = find_header(table)
+    if header_idx == -1: return []
+    columns = resolve_columns(headers)
+    if columns["psid"] == -1: return []
+    rows = []
+    for row in table[header_idx+1:]:
+        if not row or not row[0]: continue
+        student_data = parse_row(row, columns)
+        if student_data: rows.append(student_data)
+    return rows
+
+def parse_text_line(line, state_rank=False):
+    # state_rank: the sheet has a State Rank column, so AIR is the last rank column
+    m = TEXT_ROW.match(line)
+    if not m: return None
+    marks = [float(v) for v in m.group(5, 6, 7, 8)]
+    total = float(m.group('total'))
+    if abs(sum(marks) - total) > 0.5: return None
+    # Absent students are listed with every mark 0
+    if not any(marks): return None
+    data = {'psid': m.group('psid')}
+    data.update(zip(SUBJECT_FIELDS, marks))
+    data['total'] = total
+    if m.group('center_rank') is not None:
+        data['center_rank'] = int(m.group('center_rank'))
+    else:
+        data['center_rank'] = int(m.group('rank1'))
+        data['air_rank'] = int(m.group('rank3') if state_rank else m.group('rank2'))
+        data['percentile'] = float(m.group('percentile'))
+    return data
+
+def parse_text(text):
+    text = text or ""
+    # Every page repeats the sheet header, so the rank layout is known per page
+    state_rank = "State" in text
+    rows = []
+    for line in text.splitlines():
+        data = parse_text_line(line, state_rank)
+        if data: rows.append(data)
+    return rows
+
+def parse_page(page, mode="table"):
+    if mode == "text": return parse_text(page.extract_text())
+    # Aakash PDFs usually have tables. We'll look for tables.
+    rows = []
+    for table in page.extract_tables():
+        rows.extend(parse_table(table))
+    return rows
+
+# Per-process handle so pool workers open the PDF once, not once per page
+_worker_pdf = None
+_worker_mode = "table"
+
+def _init_page_worker(pdf_path, mode):
+    global _worker_pdf, _worker_mode
     import pdfplumber
-    results = []
-    
+    _worker_pdf = pdfplumber.open(pdf_path)
+    _worker_mode = mode
+
+def _parse_page_task(page_num):
+    page = _worker_pdf.pages[page_num]
+    rows = parse_page(page, _worker_mode)
+    # Release the page's parsed layout; workers keep the document open across tasks
+    page.flush_cache()
+    return page_num, rows
+
+def parse_pdf(pdf_path, mode="table", workers=None, progress=None):
+    # Generator of parsed rows in page order. Multi-page PDFs are split across a process pool
+    # (one page per task); pool.imap hands results back in page order as soon as they are ready.
+    # progress(pages_done, page_count) is called after every page.
+    import pdfplumber
+    workers = workers or os.cpu_count() or 1
+
     log(f"Opening PDF: {pdf_path}")
     try:
         with pdfplumber.open(pdf_path) as pdf:
-            for page_num, page in enumerate(pdf.pages):
-                log(f"Processing page {page_num + 1}...")
-                
-                # Table extration strategy
-                # Aakash PDFs usually have tables. We'll look for tables.
-                tables = page.extract_tables()
-                
-                for table in tables:
-                    # Heuristic: Find header row
-                    header_idx = -1
-                    headers = []
-                    
-                    for i, row in enumerate(table):
-                        # Clean row values
-                        clean_row = [str(c).lower().strip() if c else "" for c in row]
-                        
-                        # Look for identifying columns
-                        if any("psid" in c or "roll" in c for c in clean_row) and \
-                           any("phy" in c or "che" in c for c in clean_row):
-                            header_idx = i
-                            headers = clean_row
-                            break
-                    
-                    if header_idx != -1:
-                        # Process data rows
-                        for row in table[header_idx+1:]:
-                            if not row or not row[0]: continue
-                            
-                            student_data = parse_row(row, headers)
-                            if student_data:
-                                results.append(student_data)
-                                
+            page_count = len(pdf.pages)
+            if workers <= 1 or page_count <= 1:
+                for page_num, page in enumerate(pdf.pages):
+                    log(f"Processing page {page_num + 1}...")
+                    yield from parse_page(page, mode)
+                    if progress: progress(page_num + 1, page_count)
+                return
+
+        with Pool(min(workers, page_count), initializer=_init_page_worker, initargs=(pdf_path, mode)) as pool:
+            for page_num, rows in pool.imap(_parse_page_task, range(page_count)):
+                log(f"Processed page {page_num + 1}/{page_count} ({len(rows)} rows)")
+                yield from rows
+                if progress: progress(page_num + 1, page_count)
+
     except Exception as e:
+        # Re-raised: a parse that stopped part way must not be ingested or cached as the PDF's rows
         log(f"Error reading PDF: {str(e)}")
-        # Fallback manual text parsing (Mock logic for stability if generic table fails)
-        pass
+        raise
 
-    return results
+def compare_parses(table_rows, text_rows):
+    # Cross-check of the two parser modes on the same PDF; returns a list of log lines
+    table_by_psid = {r['psid']: r for r in table_rows}
+    text_by_psid = {r['psid']: r for r in text_rows}
+    fields = SUBJECT_FIELDS + ['total']
+    mismatched = [psid for psid in table_by_psid.keys() & text_by_psid.keys()
+                  if any(table_by_psid[psid].get(f) != text_by_psid[psid].get(f) for f in fields)]
+    only_table = sorted(table_by_psid.keys() - text_by_psid.keys())
+    only_text = sorted(text_by_psid.keys() - table_by_psid.keys())
+    # Text mode leaves out absentees (every mark 0); table mode keeps them
+    absent = [psid for psid in only_table if not any(table_by_psid[psid].get(f) for f in fields)]
+    only_table = [psid for psid in only_table if psid not in set(absent)]
+    lines = [f"Parser validation: table {len(table_rows)} rows, text {len(text_rows)} rows, "
+             f"{len(mismatched)} mismatched, {len(only_table)} only in table, {len(only_text)} only in text, "
+             f"{len(absent)} absentees only in table."]
+    for psid in sorted(mismatched)[:5]:
+        lines.append(f"  {psid}: table {table_by_psid[psid]} / text {text_by_psid[psid]}")
+    if only_table: lines.append(f"  only in table: {', '.join(only_table[:10])}")
+    if only_text: lines.append(f"  only in text: {', '.join(only_text[:10])}")
+    return lines
 
-def parse_row(row, headers):
-    # Map headers to indices
-    # We need PSID, Physics, Chem, Bot, Zoo
+def to_float(val):
+    # Safe number conversion
+    try:
+        return float(NON_NUMERIC.sub('', val))
+    except ValueError:
+        return 0.0
+
+def parse_row(row, columns):
+    # We need PSID, Physics, Chem, Bot, Zoo; columns comes from resolve_columns
     try:
         data = {}
         row = [str(c).strip() if c else "0" for c in row]
-        
-        # Regex helper
-        def get_idx(keywords):
-            for k in keywords:
-                for i, h in enumerate(headers):
-                    if k in h: return i
-            return -1
-
-        psid_idx = get_idx(["psid", "roll", "id"])
-        phy_idx = get_idx(["phys", "phy"])
-        che_idx = get_idx(["chem", "che"])
-        bot_idx = get_idx(["bot"])
-        zoo_idx = get_idx(["zoo"])
-        tot_idx = get_idx(["total", "score", "marks"])
-
-        if psid_idx == -1: return None
-
-        data['psid'] = row[psid_idx].strip()
-        
-        # Safe number conversion
-        def to_float(val):
-            try:
-                return float(re.sub(r'[^\d.]', '', val))
-            except:
-                return 0.0
-
-        if phy_idx != -1: data['physics'] = to_float(row[phy_idx])
-        if che_idx != -1: data['chemistry'] = to_float(row[che_idx])
-        if bot_idx != -1: data['botany'] = to_float(row[bot_idx])
-        if zoo_idx != -1: data['zoology'] = to_float(row[zoo_idx])
-        
-        # Calculate total if missing
-        calc_total = data.get('physics',0) + data.get('chemistry',0) + data.get('botany',0) + data.get('zoology',0)
-        
-        if tot_idx != -1:
-            data['total'] = to_float(row[tot_idx])
+        data['psid'] = row[columns["psid"]].strip()
+
+        for field in SUBJECT_FIELDS:
+            if columns[field] != -1: data[field] = to_float(row[columns[field]])
+
+        if columns["total"] != -1:
+            data['total'] = to_float(row[columns["total"]])
         else:
-            data['total'] = calc_total
-            
+            # Calculate total if missing
+            data['total'] = sum(data.get(field, 0) for field in SUBJECT_FIELDS)
+
         return data
 
-    except Exception as e:
-        # log(f"Row parse error: {e}")
+    except IndexError:
         return None
 
-def update_student(data, test_id, test_type, test_date, max_marks):
-    psid = data['psid']
-    # Pad PSID if necessary (Aakash usually 11 digits, but existing system uses 11)
-    # Check if directory exists
-    
-    s_path = os.path.join(STUDENTS_DIR, psid)
-    p_path = os.path.join(s_path, 'profile.json')
-    
-    if not os.path.exists(p_path):
-        log(f"Skipping {psid}: Profile not found.")
-        return False
-        
-    try:
-        with open(p_path, 'r', encoding='utf-8') as f:
-            profile = json.load(f)
-            
-        # Check for duplicate
-        existing_tests = profile.get("tests", [])
-        for t in existing_tests:
-            if t.get("norm_tid") == test_id:
-                log(f"Skipping {psid}: Test {test_id} already exists.")
-                return False
-        
-        # Create new test object
-        # Format: {"syl_date": "2025-06-15T00:00:00", "marks": {...}, "norm_tid": "FT_01", "order_idx": ...}
-        
-        # Generate order_idx based on date
-        dt = datetime.strptime(test_date, "%Y-%m-%d")
-        ts = int(dt.timestamp())
-        
-        new_test = {
-            "syl_date": f"{test_date}T00:00:00",
-            "marks": {
-                "physics": data.get('physics', 0),
-                "chemistry": data.get('chemistry', 0),
-                "botany": data.get('botany', 0),
-                "zoology": data.get('zoology', 0),
-                "total": data.get('total', 0)
-            },
-            "norm_tid": test_id,
-            "order_idx": ts, // Simple timestamp based order
-            "meta": {
-                "ingested_at": datetime.now().isoformat(),
-                "test_type": test_type
-            }
+def load_extraction():
+    with open(EXTRACTION_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def index_test(index, test):
+    norm_tid = normalize_tid(test['test_id'])
+    for s in test['students']:
+        if s.get('psid'): index[s['psid']].add(norm_tid)
+
+def build_test_index(raw_data):
+    # psid -> set of norm_tids already recorded, so duplicate checks are a set lookup
+    index = defaultdict(set)
+    for test in raw_data:
+        index_test(index, test)
+    return index
+
+def to_mark(value):
+    # parse_row yields floats; keep whole marks as ints like the rest of the extraction
+    return int(value) if float(value).is_integer() else value
+
+def extraction_row(data, sno):
+    row = {
+        "sno": sno,
+        "psid": data['psid'],
+        "name": None,
+        "batch": None,
+        "marks": {
+            "physics": to_mark(data.get('physics', 0)),
+            "chemistry": to_mark(data.get('chemistry', 0)),
+            "botany": to_mark(data.get('botany', 0)),
+            "zoology": to_mark(data.get('zoology', 0)),
+            "total": to_mark(data.get('total', 0))
         }
-        
-        existing_tests.append(new_test)
-        # Sort tests by order_idx (date)
-        existing_tests.sort(key=lambda x: x.get("order_idx", 0))
-        
-        profile['tests'] = existing_tests
-        
-        # Note: We won't update 'overall_performance' here, 
-        # we will rely on evalyx_engine.py to re-calculate that.
-        
-        with open(p_path, 'w', encoding='utf-8') as f:
-            json.dump(profile, f, indent=2)
-            
-        log(f"Updated {psid} with match.")
-        return True
-        
-    except Exception as e:
-        log(f"Error updating {psid}: {e}")
-        return False
+    }
+    # Text-layer rows also carry the sheet's ranks and percentile
+    if 'center_rank' in data: row["center rank"] = data['center_rank']
+    if 'air_rank' in data: row["air rank"] = data['air_rank']
+    if 'percentile' in data: row["percentile"] = data['percentile']
+    return row
 
-def main():
-    if len(sys.argv) < 6:
-        log("Usage: python admin_ingest.py <pdf_path> <test_id> <type> <date> <max>")
-        sys.exit(1)
+def ingest_batch_db(conn, results, test_id, test_type, test_date, max_marks):
+    # SQLite backend: one transaction of indexed upserts; (test, psid) is the table's primary key,
+    # so rows already present are skipped by the insert itself
+    known = known_psids(conn)
+    dt = datetime.strptime(test_date, "%Y-%m-%d")
+    rows = []
+    for data in results:
+        if data['psid'] not in known:
+            log(f"Skipping {data['psid']}: Profile not found.")
+            continue
+        rows.append(extraction_row(data, None))
+    with conn:
+        norm_tid = add_test(conn, test_id, test_type, dt.strftime("%d-%m-%Y"))
+        touched = upsert_results(conn, norm_tid, rows)
+    for psid in sorted({r['psid'] for r in rows} - set(touched)):
+        log(f"Skipping {psid}: Test {test_id} already exists.")
+    return touched
 
-    pdf_path = sys.argv[1]
-    test_id = sys.argv[2]
-    test_type = sys.argv[3]
-    test_date = sys.argv[4]
-    max_marks = float(sys.argv[5])
+def ingest_batch(results, test_id, test_type, test_date, max_marks):
+    # Applies every parsed row to the extraction (the engine's source of truth). With
+    # extraction_results.ndjson the new rows are appended as one line, read back as part of the
+    # test's block; with extraction_results.json the file is rewritten with a single atomic write.
+    # Returns the PSIDs that received the test and the updated extraction (None when appended:
+    # the refresh then streams the file).
+    appending = extraction_source() == EXTRACTION_LOG
+    raw_data = None if appending else load_extraction()
+    test_index = defaultdict(set)
+    known = set(os.listdir(STUDENTS_DIR)) if os.path.isdir(STUDENTS_DIR) else set()
+    norm_tid = normalize_tid(test_id)
+
+    # Rows for a test that is already partly ingested go into its existing block
+    block, existing = None, 0
+    for test in (iter_tests(EXTRACTION_LOG) if appending else raw_data):
+        index_test(test_index, test)
+        if block is None and normalize_tid(test['test_id']) == norm_tid: block = test
+    if block is None:
+        dt = datetime.strptime(test_date, "%Y-%m-%d")
+        block = {"test_id": test_id, "test_type": test_type, "test_date": dt.strftime("%d-%m-%Y"), "students": []}
+        if not appending: raw_data.append(block)
+    elif appending:
+        # A continuation line: just the new rows, numbered after the block's existing ones
+        existing = len(block['students'])
+        block = {"continues": block['test_id'], "students": []}
+
+    touched = []
+    for data in results:
+        psid = data['psid']
+        if psid not in known:
+            log(f"Skipping {psid}: Profile not found.")
+            continue
+        if norm_tid in test_index[psid]:
+            log(f"Skipping {psid}: Test {test_id} already exists.")
+            continue
+        block['students'].append(extraction_row(data, existing + len(block['students']) + 1))
+        test_index[psid].add(norm_tid)
+        touched.append(psid)
+
+    if touched and appending:
+        append_test(block)
+    elif touched:
+        write_atomic(EXTRACTION_FILE, json.dumps(raw_data, indent=2).encode('utf-8'))
+    return touched, raw_data
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest a result PDF into the student data")
+    parser.add_argument("pdf_path")
+    parser.add_argument("test_id")
+    parser.add_argument("test_type")
+    parser.add_argument("test_date", help="YYYY-MM-DD")
+    parser.add_argument("max_marks", type=float)
+    parser.add_argument("--parser", choices=PARSE_MODES, default="table",
+                        help="PDF extraction mode (text is opt-in, see PARSE_MODES)")
+    parser.add_argument("--validate", action="store_true",
+                        help="parse with both modes and report differences before ingesting")
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json",
+                        help="store results in the extraction file (.json or .ndjson) or in the SQLite database")
+    parser.add_argument("--db", default=DB_FILE, help="database file for --backend sqlite")
+    return parser.parse_args(argv)
+
+def extract_rows(pdf_path, parser="table", validate=False, progress=None):
+    # Parsed rows for a PDF, from the parse cache when the same file was parsed before
+    cache = ParseCache()
+    cache_key = file_digest(pdf_path, salt=f"parser-v{PARSER_VERSION}-{parser}")
+    results = None if validate else cache.get(cache_key)
+    if results is not None:
+        log(f"Using cached extraction for this PDF ({cache_key[:12]}).")
+        return results
 
-    log("Initializing Pipeline...")
     check_dependencies()
+    # parse_pdf raises on an unreadable page, so only complete parses reach the cache
+    results = list(parse_pdf(pdf_path, mode=parser, progress=progress))
+    if validate:
+        other = "text" if parser == "table" else "table"
+        other_rows = list(parse_pdf(pdf_path, mode=other))
+        table_rows, text_rows = (results, other_rows) if parser == "table" else (other_rows, results)
+        for line in compare_parses(table_rows, text_rows): log(line)
+    if results: cache.put(cache_key, results)
+    return results
+
+def ingest_and_refresh(results, test_id, test_type, test_date, max_marks, warm=None, backend="json", db_path=DB_FILE):
+    # 2. Ingestion
+    log("Stage 2: Database Update")
+    if backend == "sqlite":
+        conn = connect(db_path)
+        touched = ingest_batch_db(conn, results, test_id, test_type, test_date, max_marks)
+    else:
+        touched, raw_data = ingest_batch(results, test_id, test_type, test_date, max_marks)
+    log(f"Pipeline Complete. Updated {len(touched)} profiles.")
+    
+    # 3. Analytics Refresh
+    if touched:
+        log("Stage 3: Refreshing analytics for updated students...")
+        # Incremental run: only students whose tests changed (the ones touched above) are rebuilt,
+        # the leaderboards and cohort summary are refreshed from the stored summaries
+        try:
+            if backend == "sqlite":
+                run_pipeline(incremental=True, writer=DbWriter(db_path=db_path), raw_data=iter_db_extraction(conn),
+                             warm=warm)
+                # Publish: only documents that changed are rewritten under public/api
+                export_tree(conn, OutputWriter(manifest_path=DEFAULT_MANIFEST, io_threads=4))
+            else:
+                run_pipeline(incremental=True, writer=OutputWriter(manifest_path=DEFAULT_MANIFEST, io_threads=4),
+                             raw_data=raw_data, warm=warm)
+            log("Analytics refreshed successfully.")
+        except Exception as e:
+            # The results are committed but the dashboards are stale, so this must not look like
+            # a success (ingest_worker marks the job failed)
+            log(f"ERROR: Analytics refresh failed: {e}")
+            raise RuntimeError(f"Results saved, but the analytics refresh failed: {e}") from e
+    return touched
+
+def main():
+    args = parse_args()
+
+    log("Initializing Pipeline...")
     
-    # 1. Parsing
+    # 1. Parsing (skipped when the same PDF was parsed before)
     log("Stage 1: PDF Extraction")
-    results = parse_pdf(pdf_path)
+    try:
+        results = extract_rows(args.pdf_path, args.parser, args.validate)
+    except Exception as e:
+        sys.exit(f"Error reading PDF: {e}")
     
     if not results:
         log("No data found in PDF. Check format or ensure table headers match (PSID, Phy, Chem, Bot, Zoo).")
@@ -207,26 +427,11 @@ def main():
         sys.exit(0)
         
     log(f"Found {len(results)} rows.")
-
-    # 2. Ingestion
-    log("Stage 2: Database Update")
-    updated = 0
-    for r in results:
-        if update_student(r, test_id, test_type, test_date, max_marks):
-            updated += 1
-            
-    log(f"Pipeline Complete. Updated {updated} profiles.")
-    
-    # 3. Analytics Refresh
-    if updated > 0:
-        log("Stage 3: Triggering Evalyx Engine for Analytics Refresh...")
-        # We can import evalyx_engine logic or just run it via os.system
-        # Running via os.system is safer to avoid context pollution in this script
-        exit_code = os.system("python evalyx_engine.py")
-        if exit_code == 0:
-            log("Analytics refreshed successfully.")
-        else:
-            log("Warning: Analytics refresh returned error.")
+    try:
+        ingest_and_refresh(results, args.test_id, args.test_type, args.test_date, args.max_marks,
+                           backend=args.backend, db_path=args.db)
+    except RuntimeError as e:
+        sys.exit(str(e))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,157 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+
+from synth_cohort import generate, add_cohort_args, cohort_from_args
+
+# Benchmark runner: generates a synthetic cohort (synth_cohort.py) in a scratch directory and
+# runs each pipeline stage there in its own interpreter, recording wall time, CPU time, peak RSS
+# (from wait4, so per stage) and the files/bytes the stage wrote under public/api.
+# Results are saved as JSON; --baseline prints the change against an earlier result file.
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(REPO_DIR, 'bench_results')
+
+# Ingest benchmark: adds a new test for a share of the cohort through the same batch path as
+# admin_ingest (PDF parsing itself needs a real result PDF and is not covered here)
+INGEST_SNIPPET = """
+import json, random
+import admin_ingest, extraction_store
+psids = sorted({s['psid'] for t in extraction_store.iter_tests() for s in t['students']})
+rng = random.Random(0)
+rows = [{'psid': p, 'physics': 120.0, 'chemistry': 110.0, 'botany': 130.0, 'zoology': 140.0, 'total': 500.0}
+        for p in rng.sample(psids, max(1, int(len(psids) * {share})))]
+admin_ingest.ingest_and_refresh(rows, 'FT-999', 'FT', '2030-01-01', 720)
+"""
+
+def snapshot(root):
+    files = {}
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files[path] = (st.st_mtime_ns, st.st_size)
+    return files
+
+def written_since(before, after):
+    changed = [path for path, entry in after.items() if before.get(path) != entry]
+    return len(changed), sum(after[path][1] for path in changed)
+
+def run_stage(name, cmd, work_dir, log_file):
+    api_dir = os.path.join(work_dir, 'public', 'api')
+    before = snapshot(api_dir)
+    env = dict(os.environ, PYTHONPATH=REPO_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=work_dir, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+    _, status, usage = os.wait4(proc.pid, 0)
+    wall = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    files, nbytes = written_since(before, snapshot(api_dir))
+    return {
+        "stage": name,
+        "returncode": proc.returncode,
+        "wall_s": round(wall, 3),
+        "cpu_s": round(usage.ru_utime + usage.ru_stime, 3),
+        "peak_rss_mb": round(usage.ru_maxrss / 1024, 1),  # ru_maxrss is in KiB on Linux
+        "files_written": files,
+        "bytes_written": nbytes,
+    }
+
+def stage_commands(args):
+    py = sys.executable
+    script = lambda name: os.path.join(REPO_DIR, name)
+    engine = [py, script('evalyx_engine.py'), "--workers", str(args.workers)]
+    return [
+        ("engine_full", engine),
+        ("engine_incremental_noop", engine + ["--incremental"]),
+        ("leaderboards_v3", [py, script('leaderboards_v3.py')]),
+        ("cohort_stats", [py, script('cohort_stats.py')]),
+        ("update_consistency_and_batch", [py, script('update_consistency_and_batch.py')]),
+        ("admin_ingest_batch", [py, "-c", INGEST_SNIPPET.replace("{share}", str(args.ingest_share))]),
+        ("pipeline_noop", [py, script('pipeline.py')]),
+    ]
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_results(result, baseline=None):
+    base = {s["stage"]: s for s in baseline["stages"]} if baseline else {}
+    print(f"{'stage':<30} {'wall s':>9} {'cpu s':>9} {'rss MB':>9} {'files':>8} {'MB written':>11}" +
+          ("  vs baseline" if base else ""))
+    for s in result["stages"]:
+        line = (f"{s['stage']:<30} {s['wall_s']:>9.2f} {s['cpu_s']:>9.2f} {s['peak_rss_mb']:>9.1f} "
+                f"{s['files_written']:>8} {s['bytes_written'] / 1e6:>11.1f}")
+        b = base.get(s["stage"])
+        if b and b["wall_s"]: line += f"  {s['wall_s'] / b['wall_s']:.2f}x wall, {s['peak_rss_mb'] - b['peak_rss_mb']:+.1f} MB"
+        if s["returncode"] != 0: line += f"  FAILED ({s['returncode']})"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Evalyx pipeline on a synthetic cohort")
+    add_cohort_args(parser)
+    parser.add_argument("--workers", type=int, default=1, help="evalyx_engine --workers")
+    parser.add_argument("--ingest-share", type=float, default=0.5,
+                        help="share of the cohort receiving the ingested test")
+    parser.add_argument("--output", help="result file (default: bench_results/bench_<timestamp>.json)")
+    parser.add_argument("--baseline", help="earlier result file to compare against")
+    parser.add_argument("--keep", action="store_true", help="keep the generated working directory")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='evalyx_bench_')
+    try:
+        print(f"Generating cohort in {work_dir}...")
+        t0 = time.perf_counter()
+        cohort = generate(work_dir, **cohort_from_args(args))
+        cohort["generate_s"] = round(time.perf_counter() - t0, 3)
+
+        stages = []
+        with open(os.path.join(work_dir, 'bench.log'), 'w') as log_file:
+            for name, cmd in stage_commands(args):
+                print(f"Running {name}...")
+                stages.append(run_stage(name, cmd, work_dir, log_file))
+        result = {
+            "created_at": datetime.now().isoformat(),
+            "git_revision": git_revision(),
+            "host": {"platform": platform.platform(), "python": platform.python_version(),
+                     "cpus": os.cpu_count()},
+            "cohort": cohort,
+            "workers": args.workers,
+            "stages": stages,
+        }
+
+        output = args.output or os.path.join(RESULTS_DIR, f"bench_{datetime.now():%Y%m%d_%H%M%S}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+
+        baseline = None
+        if args.baseline:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        print_results(result, baseline)
+        print(f"Results saved to {output}")
+        if any(s["returncode"] != 0 for s in stages):
+            print(f"Some stages failed, see {os.path.join(work_dir, 'bench.log')}")
+            args.keep = True
+    finally:
+        if args.keep:
+            print(f"Working directory kept: {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
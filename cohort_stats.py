@@ -0,0 +1,172 @@
+import os
+import json
+import math
+import argparse
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+from output_writer import add_output_args, writer_from_args
+from test_index import normalize_tid
+from extraction_store import iter_tests
+
+# Per-test cohort statistics computed from the extraction itself (the PDF's own percentile and
+# center rank columns are often 0, 1 or out of range). One pass over each test collects a sorted
+# score array per channel; every student's rank and percentile is then a binary search into it.
+#
+#   tests/index.json                       tests with their cohort size
+#   tests/<norm_tid>/stats.json            per channel: count, mean, quantiles, histogram
+#   tests/<norm_tid>/ranks/<shard>.json    {"channels", "standings": {psid: [rank, percentile, ...]}},
+#                                          sharded by the last two PSID digits (as the leaderboard
+#                                          rank index)
+TESTS_DIR = os.path.join('public', 'api', 'tests')
+
+CHANNELS = ["physics", "chemistry", "botany", "zoology", "total"]
+QUANTILES = [0.1, 0.25, 0.5, 0.75, 0.9, 0.99]
+BIN_WIDTH = {"physics": 10, "chemistry": 10, "botany": 10, "zoology": 10, "total": 40}
+
+# bool is excluded on purpose (type() rather than isinstance)
+NUMBER_TYPES = (int, float)
+
+def collect_scores(raw_data):
+    # {norm_tid: {"test_id", "test_type", "test_date", "rows": {psid: marks}}} in file order, from
+    # any iterable of test blocks (e.g. extraction_store.iter_tests()).
+    tests = {}
+    for test in raw_data:
+        add_test_scores(tests, test)
+    return tests
+
+def add_test_scores(tests, test):
+    # One block into collect_scores' result. A PSID listed twice for a test counts once (first
+    # row), as in the SQLite backend.
+    norm_tid = normalize_tid(test['test_id'])
+    entry = tests.get(norm_tid)
+    if entry is None:
+        entry = tests[norm_tid] = {"test_id": test['test_id'], "test_type": test.get('test_type'),
+                                   "test_date": test.get('test_date'), "rows": {}}
+    rows = entry["rows"]
+    for s in test['students']:
+        psid = s['psid']
+        if not psid or psid in rows: continue
+        rows[psid] = s.get('marks') or {}
+
+def sorted_scores(rows, ch):
+    # Missing or non-numeric marks leave the student out of that channel only
+    return sorted(v for v in (marks.get(ch) for marks in rows.values()) if type(v) in NUMBER_TYPES)
+
+def quantile(sorted_values, q):
+    # Linear interpolation between closest ranks (numpy's default method)
+    pos = q * (len(sorted_values) - 1)
+    lo = math.floor(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+def histogram(sorted_values, width):
+    # Fixed-width bins from the lowest score's bin up to the highest score's bin
+    start = math.floor(sorted_values[0] / width) * width
+    counts = []
+    lo = 0
+    edge = start + width
+    while lo < len(sorted_values):
+        hi = bisect_left(sorted_values, edge, lo)
+        counts.append(hi - lo)
+        lo = hi
+        edge += width
+    return {"start": start, "width": width, "counts": counts}
+
+def channel_stats(sorted_values, width):
+    n = len(sorted_values)
+    if n == 0: return {"count": 0}
+    return {
+        "count": n,
+        "mean": round(math.fsum(sorted_values) / n, 2),
+        "min": sorted_values[0],
+        "max": sorted_values[-1],
+        "quantiles": {f"p{round(q * 100)}": round(quantile(sorted_values, q), 2) for q in QUANTILES},
+        "histogram": histogram(sorted_values, width),
+    }
+
+def standing_table(sorted_values):
+    # {score: "rank,percentile"} for each distinct score, one binary search per score. The values
+    # are pre-encoded JSON fragments: a cohort has few distinct scores but many students, so the
+    # rank files are spliced from these instead of encoding every student's numbers.
+    # rank: 1 + students scoring strictly higher (ties share a rank)
+    # percentile: share of the channel's cohort scoring at or below, in percent
+    n = len(sorted_values)
+    table = {}
+    for v in set(sorted_values):
+        at_or_below = bisect_right(sorted_values, v)
+        table[v] = json.dumps([n - at_or_below + 1, round(100.0 * at_or_below / n, 2)], separators=(",", ":"))[1:-1]
+    return table
+
+def standings(rows, scores):
+    # psid -> "rank,percentile,..." over CHANNELS (null,null when the student has no mark for
+    # the channel), i.e. the body of a JSON array
+    tables = [standing_table(scores[ch]) for ch in CHANNELS]
+    result = {}
+    for psid, marks in rows.items():
+        parts = []
+        for ch, table in zip(CHANNELS, tables):
+            v = marks.get(ch)
+            parts.append(table[v] if type(v) in NUMBER_TYPES else "null,null")
+        result[psid] = ",".join(parts)
+    return result
+
+def rank_shard(part):
+    body = ",".join(f"{json.dumps(psid)}:[{standing}]" for psid, standing in part.items())
+    return f'{{"channels":{json.dumps(CHANNELS, separators=(",", ":"))},"standings":{{{body}}}}}'.encode('utf-8')
+
+def test_stats(entry):
+    rows = entry["rows"]
+    scores = {ch: sorted_scores(rows, ch) for ch in CHANNELS}
+    stats = {
+        "test_id": entry["test_id"],
+        "test_type": entry["test_type"],
+        "test_date": entry["test_date"],
+        "students": len(rows),
+        "channels": {ch: channel_stats(values, BIN_WIDTH[ch]) for ch, values in scores.items()},
+    }
+    return stats, standings(rows, scores)
+
+def write_test_stats(tests, writer, out_dir=TESTS_DIR):
+    # tests: collect_scores() result. Returns the number of tests written. Files carry no
+    # timestamp so a rerun on unchanged data is skipped by the writer; only the index records
+    # when it was generated.
+    index = []
+    for norm_tid, entry in tests.items():
+        stats, ranks = test_stats(entry)
+        test_dir = os.path.join(out_dir, norm_tid)
+        writer.write(os.path.join(test_dir, 'stats.json'), stats, kind="test_stats")
+        shards = {}
+        for psid, standing in ranks.items():
+            shards.setdefault(psid[-2:], {})[psid] = standing
+        # Rank shards are lookup files and always compact
+        ranks_dir = os.path.join(test_dir, 'ranks')
+        for shard, part in shards.items():
+            writer.write_raw(os.path.join(ranks_dir, f"{shard}.json"), rank_shard(part), kind="test_ranks")
+        # A shard whose students all left the test would otherwise keep serving their old standings
+        for name in writer.listdir(ranks_dir):
+            if name.endswith(".json") and name[:-5] not in shards: writer.remove(os.path.join(ranks_dir, name))
+        index.append({"norm_tid": norm_tid, "test_id": entry["test_id"], "test_type": entry["test_type"],
+                      "test_date": entry["test_date"], "students": stats["students"]})
+    # Tests no longer in the extraction: unpublish their stats and ranks
+    for norm_tid in writer.listdir(out_dir):
+        test_dir = os.path.join(out_dir, norm_tid)
+        if norm_tid in tests or not os.path.isdir(test_dir): continue
+        ranks_dir = os.path.join(test_dir, 'ranks')
+        for name in writer.listdir(ranks_dir):
+            if name.endswith(".json"): writer.remove(os.path.join(ranks_dir, name))
+        writer.remove(os.path.join(test_dir, 'stats.json'))
+    writer.write(os.path.join(out_dir, 'index.json'),
+                 {"generated_at": datetime.now().isoformat(), "tests": index}, kind="test_stats_index")
+    return len(index)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write per-test cohort statistics and standings")
+    parser.add_argument("--extraction", help="extraction file (.json or .ndjson; default: the current extraction)")
+    add_output_args(parser)
+    args = parser.parse_args()
+    writer = writer_from_args(args)
+    count = write_test_stats(collect_scores(iter_tests(args.extraction)), writer)
+    writer.close()
+    writer.report()
+    print(f"Test statistics written for {count} tests.")
@@ -0,0 +1,131 @@
+import os
+import mmap
+import struct
+
+from output_writer import write_atomic
+
+# Compact cohort summary store maintained by evalyx_engine: one fixed-width row per student with
+# the metrics and tie-breakers the cohort-wide outputs (leaderboards, students_index) need, so they
+# no longer have to parse every profile.json.
+#
+# Layout: header | rows (ROW.size bytes each) | UTF-8 string blob (names and batches)
+# An input of the build, not a published file, so it lives under data/
+SUMMARY_FILE = os.path.join('data', 'cohort_summary.bin')
+
+MAGIC = b'EVXS'
+VERSION = 1
+HEADER = struct.Struct('<4sHHI')            # magic, version, row size, row count
+ROW = struct.Struct('<16sIHIHBHH8d')        # psid, name off/len, batch off/len, trend, int flags, tests_taken, numbers
+
+NUMBER_FIELDS = ["latest_score", "average_total_score", "best_score", "consistency_index",
+                 "physics", "chemistry", "botany", "zoology"]
+TRENDS = ["stable", "improving", "declining", "insufficient_data"]
+SUBJECTS = ["physics", "chemistry", "botany", "zoology"]
+NO_STRING = 0xFFFF  # string length marking a missing (None) name/batch
+
+FIELDS = ["psid", "name", "batch", "trend", "tests_taken"] + NUMBER_FIELDS
+
+class Summary:
+    # One student's row of the cohort passes. The engine holds one per student for the whole run
+    # (and keeps them in engine_state.json), so it is slotted: a fixed set of attributes instead
+    # of a dict per student. Full profiles are never kept; they are reduced to this once written.
+    __slots__ = FIELDS
+
+    def __init__(self, *values):
+        for field, value in zip(FIELDS, values):
+            setattr(self, field, value)
+
+    def row(self):
+        # Field values in FIELDS order (how engine_state.json stores it)
+        return [getattr(self, field) for field in FIELDS]
+
+    def __getstate__(self):
+        return self.row()
+
+    def __setstate__(self, row):
+        self.__init__(*row)
+
+def summary_from_profile(profile):
+    perf = profile["overall_performance"]
+    return Summary(profile["psid"], profile.get("name", "Unknown"), profile.get("batch", "N/A"),
+                   perf["trend"], profile["meta"]["tests_taken"], perf["latest_score"],
+                   perf["average_total_score"], perf["best_score"], perf.get("consistency_index", 0),
+                   *[profile["subjects"][sub]["average_percentage"] for sub in SUBJECTS])
+
+def index_entry(record):
+    # students_index.json row
+    return {
+        "psid": record.psid,
+        "name": record.name,
+        "batch": record.batch,
+        "tests_taken": record.tests_taken,
+        "latest_score": record.latest_score,
+        "trend": record.trend
+    }
+
+def unsummarized_profiles(summaries, students_dir):
+    # PSIDs with a profile.json under students_dir but no summary: folders the engine no longer
+    # builds (the PSID left the extraction). Cohort outputs built from the summaries leave them
+    # out, where the old glob-based scripts listed every folder.
+    known = {s.psid for s in summaries}
+    try:
+        names = os.listdir(students_dir)
+    except OSError:
+        return []
+    return sorted(n for n in names if n not in known and os.path.exists(os.path.join(students_dir, n, 'profile.json')))
+
+def _add_string(blob, value):
+    if value is None: return 0, NO_STRING
+    raw = value.encode('utf-8')
+    if len(raw) >= NO_STRING: raw = raw[:NO_STRING - 1].decode('utf-8', 'ignore').encode('utf-8')
+    off = len(blob)
+    blob.extend(raw)
+    return off, len(raw)
+
+def pack_records(records):
+    rows = bytearray()
+    blob = bytearray()
+    for r in records:
+        psid = r.psid.encode('ascii')
+        if len(psid) > 16: raise ValueError(f"PSID too long for summary store: {r.psid}")
+        name_off, name_len = _add_string(blob, r.name)
+        batch_off, batch_len = _add_string(blob, r.batch)
+        # Remember which numbers were ints so readers reproduce the same JSON (672 vs 672.0)
+        numbers = [getattr(r, field) for field in NUMBER_FIELDS]
+        int_flags = 0
+        for i, value in enumerate(numbers):
+            if isinstance(value, int): int_flags |= 1 << i
+        rows.extend(ROW.pack(psid, name_off, name_len, batch_off, batch_len, TRENDS.index(r.trend),
+                             int_flags, r.tests_taken, *[float(v) for v in numbers]))
+    return HEADER.pack(MAGIC, VERSION, ROW.size, len(records)) + bytes(rows) + bytes(blob)
+
+def _string(buf, blob_start, off, length):
+    if length == NO_STRING: return None
+    return bytes(buf[blob_start + off:blob_start + off + length]).decode('utf-8')
+
+def unpack_records(buf):
+    magic, version, row_size, count = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC or version != VERSION or row_size != ROW.size:
+        raise ValueError("Unsupported cohort summary store format")
+    blob_start = HEADER.size + count * ROW.size
+    records = []
+    for i in range(count):
+        psid, name_off, name_len, batch_off, batch_len, trend, int_flags, tests_taken, *numbers = \
+            ROW.unpack_from(buf, HEADER.size + i * ROW.size)
+        records.append(Summary(psid.rstrip(b'\0').decode('ascii'),
+                               _string(buf, blob_start, name_off, name_len),
+                               _string(buf, blob_start, batch_off, batch_len),
+                               TRENDS[trend], tests_taken,
+                               *[int(v) if int_flags & (1 << j) else v for j, v in enumerate(numbers)]))
+    return records
+
+def read_summary_store(path=SUMMARY_FILE):
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0: return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            return unpack_records(buf)
+
+def write_summary_store(records, path=SUMMARY_FILE):
+    out_dir = os.path.dirname(path)
+    if out_dir: os.makedirs(out_dir, exist_ok=True)
+    write_atomic(path, pack_records(records))
@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import sqlite3
+import argparse
+
+from output_writer import OutputWriter, add_output_args, writer_from_args
+from test_index import normalize_tid
+from extraction_store import iter_tests
+
+# Optional SQLite backend. Holds the test results (instead of extraction_results.json), the
+# derived per-student metrics and every JSON document the engine produces; `export` then
+# materializes the public/api tree from the documents table.
+#
+#   python evalyx_db.py import                           load the extraction (.json or .ndjson)
+#   python evalyx_engine.py --backend sqlite             rebuild into the database
+#   python evalyx_db.py export [--compact ...]           write public/api from the database
+#   python evalyx_db.py query --test FT8                 PSIDs that took a test (indexed)
+DB_FILE = os.path.join('data', 'evalyx.sqlite3')
+
+SUBJECT_COLUMNS = ["physics", "chemistry", "botany", "zoology", "total"]
+METRIC_COLUMNS = ["name", "batch", "trend", "tests_taken", "latest_score", "average_total_score",
+                  "best_score", "consistency_index", "physics", "chemistry", "botany", "zoology"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tests (
+    norm_tid TEXT PRIMARY KEY,
+    test_id TEXT NOT NULL,
+    test_type TEXT,
+    test_date TEXT,
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS students (
+    psid TEXT PRIMARY KEY,
+    name TEXT,
+    batch TEXT
+);
+-- One row per student per test; row_json keeps the extraction row exactly as ingested,
+-- the mark columns are there for queries
+CREATE TABLE IF NOT EXISTS results (
+    norm_tid TEXT NOT NULL REFERENCES tests(norm_tid),
+    psid TEXT NOT NULL REFERENCES students(psid),
+    seq INTEGER NOT NULL,
+    physics REAL, chemistry REAL, botany REAL, zoology REAL, total REAL,
+    row_json TEXT NOT NULL,
+    PRIMARY KEY (norm_tid, psid)
+);
+CREATE INDEX IF NOT EXISTS results_psid ON results(psid);
+CREATE TABLE IF NOT EXISTS metrics (
+    psid TEXT PRIMARY KEY REFERENCES students(psid),
+    fingerprint TEXT,
+    name TEXT, batch TEXT, trend TEXT, tests_taken INTEGER,
+    latest_score REAL, average_total_score REAL, best_score REAL, consistency_index REAL,
+    physics REAL, chemistry REAL, botany REAL, zoology REAL
+);
+CREATE INDEX IF NOT EXISTS metrics_batch ON metrics(batch);
+CREATE TABLE IF NOT EXISTS documents (
+    path TEXT PRIMARY KEY,
+    kind TEXT,
+    sha1 TEXT NOT NULL,
+    body BLOB NOT NULL,
+    updated_at REAL
+);
+"""
+
+def connect(path=DB_FILE):
+    out_dir = os.path.dirname(path)
+    if out_dir: os.makedirs(out_dir, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def add_test(conn, test_id, test_type, test_date):
+    # Returns the test's norm_tid; an already known test keeps its position
+    norm_tid = normalize_tid(test_id)
+    position = conn.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM tests").fetchone()[0]
+    conn.execute("INSERT OR IGNORE INTO tests (norm_tid, test_id, test_type, test_date, position) VALUES (?, ?, ?, ?, ?)",
+                 (norm_tid, test_id, test_type, test_date, position))
+    return norm_tid
+
+def upsert_results(conn, norm_tid, rows):
+    # rows: extraction-format student rows. Rows already present for (test, psid) are left as
+    # they are (the primary key is the duplicate check); returns the PSIDs that were inserted.
+    seq = conn.execute("SELECT COALESCE(MAX(seq) + 1, 0) FROM results WHERE norm_tid = ?", (norm_tid,)).fetchone()[0]
+    inserted = []
+    for row in rows:
+        psid = row['psid']
+        if not psid: continue
+        conn.execute("INSERT OR IGNORE INTO students (psid) VALUES (?)", (psid,))
+        if row.get('sno') is None: row = {**row, "sno": seq + 1}
+        marks = row.get('marks', {})
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO results (norm_tid, psid, seq, physics, chemistry, botany, zoology, total, row_json) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (norm_tid, psid, seq, *[marks.get(c) for c in SUBJECT_COLUMNS], json.dumps(row)))
+        if cur.rowcount:
+            inserted.append(psid)
+            seq += 1
+    return inserted
+
+def known_psids(conn):
+    return {psid for (psid,) in conn.execute("SELECT psid FROM students")}
+
+def import_extraction(conn, raw_data):
+    # Same-PSID rows repeated within one test keep only the first (the table's primary key)
+    with conn:
+        for test in raw_data:
+            norm_tid = add_test(conn, test['test_id'], test.get('test_type'), test.get('test_date'))
+            upsert_results(conn, norm_tid, test['students'])
+
+def iter_extraction(conn):
+    # The extraction as the engine reads it, rebuilt from the tables one test block at a time
+    tests = conn.execute("SELECT norm_tid, test_id, test_type, test_date FROM tests ORDER BY position").fetchall()
+    for norm_tid, test_id, test_type, test_date in tests:
+        rows = conn.execute("SELECT row_json FROM results WHERE norm_tid = ? ORDER BY seq", (norm_tid,))
+        yield {"test_id": test_id, "test_type": test_type, "test_date": test_date,
+               "students": [json.loads(row_json) for (row_json,) in rows]}
+
+def save_metrics(conn, state):
+    # state: engine new_state ({psid: {"fingerprint", "summary"}})
+    with conn:
+        conn.executemany(
+            f"INSERT OR REPLACE INTO metrics (psid, fingerprint, {', '.join(METRIC_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * (len(METRIC_COLUMNS) + 2))})",
+            [(psid, entry["fingerprint"], *[getattr(entry["summary"], c) for c in METRIC_COLUMNS]) for psid, entry in state.items()])
+        conn.executemany("UPDATE students SET name = ?, batch = ? WHERE psid = ?",
+                         [(entry["summary"].name, entry["summary"].batch, psid) for psid, entry in state.items()])
+
+def psids_for_test(conn, test_id):
+    return [psid for (psid,) in conn.execute("SELECT psid FROM results WHERE norm_tid = ? ORDER BY seq",
+                                             (normalize_tid(test_id),))]
+
+class DbWriter(OutputWriter):
+    # OutputWriter that stores documents in the database instead of public/api. Unchanged
+    # documents are skipped by comparing hashes with the documents table. In pool workers
+    # (no connection) documents are buffered and handed to the parent with the write stats.
+    BATCH = 500
+
+    def __init__(self, compact=False, precompress=(), manifest_path=None, io_threads=0, skip_unchanged=True,
+                 db_path=DB_FILE, connect_db=True):
+        # Compression and file writes happen at export time
+        super().__init__(compact=compact, skip_unchanged=skip_unchanged)
+        self.db_path = db_path
+        self.conn = connect(db_path) if connect_db else None
+        self.docs = []
+        if self.conn is not None:
+            self.manifest = {path: [sha1, None] for path, sha1 in self.conn.execute("SELECT path, sha1 FROM documents")}
+
+    def spawn_args(self):
+        return {"compact": self.compact, "skip_unchanged": self.skip_unchanged, "db_path": self.db_path,
+                "connect_db": False, "manifest": self.manifest}
+
+    def exists(self, path):
+        return path in self.manifest
+
+    def read(self, path):
+        if self.conn is None: return None
+        if self.docs: self._store()
+        row = self.conn.execute("SELECT body FROM documents WHERE path = ?", (path,)).fetchone()
+        return bytes(row[0]) if row else None
+
+    def listdir(self, path):
+        prefix = path.rstrip('/') + '/'
+        return [p[len(prefix):] for p in self.manifest if p.startswith(prefix) and '/' not in p[len(prefix):]]
+
+    def remove(self, path):
+        if self.docs: self._store()
+        self.manifest.pop(path, None)
+        if self.conn is None: return
+        with self.conn:
+            self.conn.execute("DELETE FROM documents WHERE path = ?", (path,))
+
+    def _unchanged(self, path, digest):
+        entry = self.manifest.get(path)
+        return bool(entry) and entry[0] == digest
+
+    def _write_files(self, path, raw, digest, stat, kind):
+        self.docs.append((path, kind, digest, raw, time.time()))
+        self.manifest[path] = [digest, None]
+        self.manifest_updates[path] = [digest, None]
+        if self.conn is not None and len(self.docs) >= self.BATCH: self._store()
+
+    def _store(self):
+        docs, self.docs = self.docs, []
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO documents (path, kind, sha1, body, updated_at) VALUES (?, ?, ?, ?, ?)", docs)
+
+    def pop_results(self):
+        stats, manifest_updates = super().pop_results()
+        docs, self.docs = self.docs, []
+        return stats, manifest_updates, docs
+
+    def merge_results(self, results):
+        stats, manifest_updates, docs = results
+        super().merge_results((stats, manifest_updates))
+        self.docs.extend(docs)
+        if len(self.docs) >= self.BATCH: self._store()
+
+    def close(self):
+        self.flush()
+        if self.docs: self._store()
+        self.manifest_updates = {}
+
+def export_tree(conn, writer):
+    # Writes every stored document to its path; the writer skips files already up to date
+    count = 0
+    for path, kind, body in conn.execute("SELECT path, kind, body FROM documents ORDER BY path"):
+        writer.write_raw(path, bytes(body), kind)
+        count += 1
+    writer.close()
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite backend for the Evalyx data")
+    parser.add_argument("--db", default=DB_FILE, help="database file")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_import = sub.add_parser("import", help="load the extraction into the database")
+    p_import.add_argument("--extraction", help="extraction file (.json or .ndjson; default: the current extraction)")
+    p_export = sub.add_parser("export", help="materialize the public/api JSON tree from the database")
+    add_output_args(p_export)
+    p_query = sub.add_parser("query", help="list the PSIDs that took a test")
+    p_query.add_argument("--test", required=True)
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    if args.command == "import":
+        import_extraction(conn, iter_tests(args.extraction))
+        tests, rows = conn.execute("SELECT (SELECT COUNT(*) FROM tests), (SELECT COUNT(*) FROM results)").fetchone()
+        print(f"Imported {tests} tests, {rows} results into {args.db}")
+    elif args.command == "export":
+        writer = writer_from_args(args)
+        count = export_tree(conn, writer)
+        writer.report()
+        print(f"Exported {count} documents from {args.db}")
+    elif args.command == "query":
+        for psid in psids_for_test(conn, args.test):
+            print(psid)
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,106 @@
 import json
 import os
-import glob
 import math
-import re
+import hashlib
+import argparse
+from multiprocessing import Pool
+from contextlib import contextmanager
+
+import score_tensor
+from output_writer import OutputWriter, add_output_args, writer_from_args, write_atomic
+from leaderboards_v3 import write_boards
+from cohort_summary import Summary, summary_from_profile, write_summary_store, index_entry, unsummarized_profiles
+from cohort_stats import write_test_stats, add_test_scores
+from extraction_store import extraction_source, iter_tests
+from run_report import RunReport, SectionTimer
+from test_index import normalize_tid, load_syllabus
+from evalyx_db import DB_FILE, DbWriter, save_metrics, iter_extraction as iter_db_extraction
 from collections import defaultdict, Counter
 from datetime import datetime
 
 # Path Config
 ROOT = r'public/api'
-EXTRACTION_FILE = os.path.join(ROOT, 'extraction_results.json')
 SYLLABUS_FILE = os.path.join(ROOT, 'test_syllabus.json')
 STUDENTS_DIR = os.path.join(ROOT, 'students')
-LEADERBOARD_PUBLIC = os.path.join(ROOT, 'leaderboards', 'public')
-
-def prefix_fix(p):
-    if p == "NBTSR": return "NBTS"
-    return p
-
-def normalize_tid(tid):
-    if not tid: return ""
-    tid = str(tid).upper()
-    pm = re.search(r"([A-Z]+)", tid)
-    nm = re.search(r"(\d+)", tid)
-    if pm and nm:
-        p = pm.group(1)
-        n = int(nm.group(1))
-        return f"{prefix_fix(p)}{n}"
-    return tid.replace("-", "").replace("_", "").replace(" ", "")
-
-def parse_syllabus_date(date_str):
-    if not date_str: return datetime(1900, 1, 1)
-    try:
-        clean = re.sub(r"(\d+)(st|nd|rd|th)", r"\1", date_str)
-        clean = clean.replace("'", " ").replace(".", " ").replace("  ", " ")
-        formats = ["%d %b %y", "%d %B %y"]
-        for fmt in formats:
-            try: return datetime.strptime(clean.strip(), fmt)
-            except: continue
-    except: pass
-    return datetime(1900, 1, 1)
+MANUAL_NAMES_FILE = os.path.join(ROOT, 'manual_names.json')
+INDEX_FILE = os.path.join(ROOT, 'students_index.json')
+# Per-student input fingerprints + leaderboard summaries from the last run (used by --incremental).
+# Build state, so it lives under data/ rather than the statically served public/api
+STATE_FILE = os.path.join('data', 'engine_state.json')
+
+# Stage timings of the last run (see run_report.py); kept out of the served public/api tree
+REPORT_FILE = os.path.join('data', 'engine_run_report.json')
+PROFILE_FILE = os.path.join('data', 'engine_profile.prof')
+
+# Shared x axes of the subject-trend charts (per-student graph files index into them)
+AXES_FILE = os.path.join(ROOT, 'graphs', 'test_axes.json')
+
+# Bump when the analytics logic changes so incremental runs rebuild everyone
+ENGINE_VERSION = "2.9"
+
+SUBJECTS = ["physics", "chemistry", "botany", "zoology"]
+
+# Students whose tensor metrics are materialized as Python dicts at a time; each block is handed
+# to the per-student pass and dropped, so peak memory does not grow with the number of rebuilds
+METRICS_BLOCK = 2000
+
+# Recent-drop flags for the consistency module
+DROP_NONE, DROP_SIGNIFICANT, DROP_RECENT = 0, 1, 2
+DROP_REASONS = {DROP_NONE: "", DROP_SIGNIFICANT: "Score dropped significantly.", DROP_RECENT: "Score declined recently."}
+
+# Subject-trend charts, one per test category ("match": substring of the normalized test ID)
+GRAPH_DEFINITIONS = [
+    {"id": "all_tests_subject_trend", "title": "Overall Subject Performance (All Tests)", "match": None},
+    {"id": "aiats_subject_trend", "title": "AIATS Subject Performance", "match": "AIATS"},
+    {"id": "ft_subject_trend", "title": "Fortnightly Test (FT) Subject Performance", "match": "FT"},
+    {"id": "nbts_subject_trend", "title": "NCERT Booster Test (NBTS) Subject Performance", "match": "NBTS"}
+]
+
+# Field-level profile patches: post-processing rules that own a few profile fields (dotted paths).
+# They run inside the per-student pass, right after the profile is assembled, so a rule like the
+# batch assignment needs no separate read/rewrite pass over students/. Patch versions are part
+# of the fingerprint: bumping one rebuilds every profile on the next incremental run. A patch
+# returns DELETE for an owned field that must not be present.
+PROFILE_PATCHES = []
+DELETE = object()
+
+# Per-student files in bundle order (the keys of build_student's outputs)
+STUDENT_SECTIONS = [
+    'profile.json',
+    os.path.join('graphs', 'subject_trends.json'),
+    os.path.join('graphs', 'progress_delta.json'),
+    os.path.join('analysis', 'consistency.json'),
+    os.path.join('analysis', 'readiness.json'),
+    'prediction.json',
+]
+
+def profile_patch(name, fields, version=1):
+    def register(fn):
+        owned = {f for p in PROFILE_PATCHES for f in p["fields"]}
+        if owned & set(fields): raise ValueError(f"profile patch {name}: fields already owned: {sorted(owned & set(fields))}")
+        PROFILE_PATCHES.append({"name": name, "fields": tuple(fields), "version": version, "apply": fn})
+        return fn
+    return register
+
+def apply_profile_patches(profile):
+    for patch in PROFILE_PATCHES:
+        for path, value in patch["apply"](profile).items():
+            if path not in patch["fields"]: raise ValueError(f"profile patch {patch['name']} does not own {path}")
+            *parents, key = path.split(".")
+            target = profile
+            for part in parents:
+                target = target.setdefault(part, {})
+            if value is DELETE:
+                target.pop(key, None)
+            else:
+                target[key] = value
+
+@profile_patch("named_batch", fields=("batch", "meta.batch"))
+def named_batch(profile):
+    # Students with a known name are in RMS1 (formerly update_consistency_and_batch.py)
+    name = profile["name"]
+    if name and name != "Unknown": return {"batch": "RMS1", "meta.batch": "RMS1"}
+    return {"meta.batch": DELETE}
 
 def compute_consistency(scores):
     if not scores or len(scores) == 0: return 0.0
@@ -52,26 +114,10 @@ def compute_consistency(scores):
     reliability = min(1.0, math.log2(n + 1) / math.log2(15))
     return round(avg * (1 / (cv + 1)) * reliability, 2)
 
-def run_pipeline():
-    print("Starting Evalyx Data Pipeline (v2.3 - Priority Fix)...")
-    
-    with open(SYLLABUS_FILE, 'r', encoding='utf-8') as f:
-        syllabus_list = json.load(f)
-    
-    syllabus_map = {}
-    test_dates = {}
-    test_order = {}
-    for i, t in enumerate(syllabus_list):
-        ntid = normalize_tid(t['test_id'])
-        syllabus_map[ntid] = t['subjects']
-        test_dates[ntid] = parse_syllabus_date(t['test_date'])
-        test_order[ntid] = i
-        
-    with open(EXTRACTION_FILE, 'r', encoding='utf-8') as f:
-        raw_data = json.load(f)
-
-    student_map = defaultdict(lambda: {"tests": [], "names": [], "batches": []})
-    for test in raw_data:
+def build_student_map(raw_data, test_dates, test_order):
+    # "blocks" runs parallel to "tests": the extraction block each row came from (its tensor column)
+    student_map = defaultdict(lambda: {"tests": [], "names": [], "batches": [], "blocks": []})
+    for block_no, test in enumerate(raw_data):
         tid = test['test_id']
         norm_tid = normalize_tid(tid)
         syl_date = test_dates.get(norm_tid, datetime(1900, 1, 1))
@@ -90,424 +136,818 @@ def run_pipeline():
                 "air_rank": s.get('air rank'),
                 "percentile": s.get('percentile', 0)
             })
+            student_map[psid]["blocks"].append(block_no)
             if s.get('name'): student_map[psid]["names"].append(s['name'])
             if s.get('batch'): student_map[psid]["batches"].append(s['batch'])
-
-    # Load Manual Names
-    manual_names_file = os.path.join(ROOT, 'manual_names.json')
+    return student_map
+
+def scan_extraction(blocks, test_dates, test_order, with_scores=False):
+    # One pass over the extraction (any iterable of test blocks, e.g. iter_tests()): the per-student
+    # rows, each block's fields without its rows ("headers", in file order) and, with_scores, the
+    # per-test scores for cohort_stats. A block is dropped as soon as it is aggregated, so memory
+    # follows what is kept from the rows, not the size of the file.
+    headers = []
+    scores = {} if with_scores else None
+    def tap():
+        for test in blocks:
+            headers.append({k: v for k, v in test.items() if k != 'students'})
+            if scores is not None: add_test_scores(scores, test)
+            yield test
+    student_map = build_student_map(tap(), test_dates, test_order)
+    return student_map, headers, scores
+
+def build_graph_axes(headers, test_dates, test_order):
+    # headers: scan_extraction's test blocks (rows not needed)
+    # Cohort-wide x axis of each subject-trend chart: every test of the category in the order a
+    # student's tests are sorted (syllabus date, syllabus order, then file order). "positions"
+    # maps norm_tid -> its slots on the axis (more than one if the test ID is in two blocks).
+    keyed = []
+    for test in headers:
+        norm_tid = normalize_tid(test['test_id'])
+        syl_date = test_dates.get(norm_tid, datetime(1900, 1, 1)).isoformat()
+        keyed.append(((syl_date, test_order.get(norm_tid, 999)), norm_tid, test['test_id'], syl_date))
+    keyed.sort(key=lambda k: k[0])
+
+    axes = []
+    for g_def in GRAPH_DEFINITIONS:
+        tests = [k for k in keyed if g_def["match"] is None or g_def["match"] in k[1]]
+        positions = defaultdict(list)
+        for pos, k in enumerate(tests):
+            positions[k[1]].append(pos)
+        axes.append({
+            "graph_id": g_def["id"],
+            "title": g_def["title"],
+            "test_ids": [k[2] for k in tests],
+            "values": [k[3].split("T")[0] for k in tests],
+            "positions": dict(positions),
+        })
+    return axes
+
+def write_graph_axes(axes, writer):
+    writer.write(AXES_FILE, {
+        "x_label": "Test Date",
+        "subjects": SUBJECTS,
+        "graphs": [{k: axis[k] for k in ("graph_id", "title", "test_ids", "values")} for axis in axes],
+    }, kind="graph_axes")
+
+def graph_positions(tests, axes):
+    # A student's x indices on every axis, ascending (= their sorted test order). tests are in
+    # file order, so a test ID listed in two blocks takes its slots in turn.
+    result = [[] for _ in axes]
+    seen = {}
+    for t in tests:
+        ntid = t["norm_tid"]
+        k = seen.get(ntid, 0)
+        seen[ntid] = k + 1
+        for xs, axis in zip(result, axes):
+            slots = axis["positions"].get(ntid)
+            if slots: xs.append(slots[min(k, len(slots) - 1)])
+    for xs in result:
+        xs.sort()
+    return result
+
+def load_manual_names():
     manual_names = {}
-    if os.path.exists(manual_names_file):
-        with open(manual_names_file, 'r', encoding='utf-8') as f:
+    if os.path.exists(MANUAL_NAMES_FILE):
+        with open(MANUAL_NAMES_FILE, 'r', encoding='utf-8') as f:
             manual_names = json.load(f)
+    return manual_names
 
-    student_profiles = []
-    for psid, info in student_map.items():
-        # Override with manual name if provided
-        if psid in manual_names:
-            name = manual_names[psid]
-        else:
-            name = Counter(info["names"]).most_common(1)[0][0] if info["names"] else "Unknown"
-            
-        batch = Counter(info["batches"]).most_common(1)[0][0] if info["batches"] else "N/A"
-        if name and name != "Unknown": batch = "RMS1"
-            
-        sorted_tests = sorted(info["tests"], key=lambda x: (x["syl_date"], x["order_idx"]))
-        
-        # Priority logic for "Latest"
-        # 1. Find the latest test that happened according to chronological order
-        # 2. BUT user specifically said FT08 is the latest happened.
-        # So we filter out any test that has index > index of FT08 in the syllabus
-        # OR we just prioritize FT tests.
-        
-        ft_08_index = test_order.get("FT8", 999)
-        # Only consider tests up to FT08 as "Already Happened"
-        happened_tests = [t for t in sorted_tests if t["order_idx"] <= ft_08_index]
+def load_state(output_config):
+    if not os.path.exists(STATE_FILE): return {}
+    try:
+        with open(STATE_FILE, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if state.get("engine_version") != ENGINE_VERSION: return {}
+    # Files written in another format (compact / precompressed) must be rewritten
+    if state.get("output_config") != output_config: return {}
+    students = state.get("students", {})
+    for entry in students.values():
+        entry["summary"] = Summary(*entry["summary"])
+    return students
+
+def save_state(students, output_config):
+    # Summaries are stored as plain rows (cohort_summary.FIELDS order)
+    students = {psid: {**entry, "summary": entry["summary"].row()} for psid, entry in students.items()}
+    state = {"engine_version": ENGINE_VERSION, "output_config": output_config, "students": students}
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    write_atomic(STATE_FILE, json.dumps(state).encode('utf-8'))
+
+def student_identity(psid, info, manual_names):
+    # [name, batch] before profile patches; the manual name overrides the extracted ones
+    if psid in manual_names:
+        name = manual_names[psid]
+    else:
+        name = Counter(info["names"]).most_common(1)[0][0] if info["names"] else "Unknown"
+    batch = Counter(info["batches"]).most_common(1)[0][0] if info["batches"] else "N/A"
+    return [name, batch]
+
+def student_fingerprint(psid, info, syllabus_map, test_order, axes):
+    # Everything build_student reads for this PSID apart from the identity (student_identity,
+    # compared separately so a rename only relabels the profile): their extraction rows (with
+    # the syllabus date/order already resolved), the syllabus entries of the tests they took,
+    # the FT08 cut-off used for "latest" and where their tests sit on the shared graph axes (a
+    # test inserted earlier in the timeline shifts them).
+    payload = {
+        "tests": info["tests"],
+        "syllabus": {t["norm_tid"]: syllabus_map.get(t["norm_tid"]) for t in info["tests"]},
+        "ft8_index": test_order.get("FT8", 999),
+        "graph_x": graph_positions(info["tests"], axes),
+        "patches": [[p["name"], p["version"]] for p in PROFILE_PATCHES],
+    }
+    raw = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+def compute_metrics(sorted_tests, test_order):
+    # Numeric building blocks of the profile and the analytics modules. This is the scalar
+    # reference; score_tensor.cohort_metrics returns the same dict for a whole cohort at once.
+    metrics = {}
+
+    # Priority logic for "Latest"
+    # 1. Find the latest test that happened according to chronological order
+    # 2. BUT user specifically said FT08 is the latest happened.
+    # So we filter out any test that has index > index of FT08 in the syllabus
+    # OR we just prioritize FT tests.
+    
+    ft_08_index = test_order.get("FT8", 999)
+    # Only consider tests up to FT08 as "Already Happened"
+    happened = [i for i, t in enumerate(sorted_tests) if t["order_idx"] <= ft_08_index]
+    metrics["latest_pos"] = happened[-1] if happened else len(sorted_tests) - 1
+    latest_t = sorted_tests[metrics["latest_pos"]]
+
+    score_pos = [i for i, t in enumerate(sorted_tests) if t["marks"].get("total") is not None]
+    scores = [sorted_tests[i]["marks"]["total"] for i in score_pos]
+    metrics["avg_score"] = sum(scores)/len(scores) if scores else 0
+    metrics["best_pos"] = score_pos[scores.index(max(scores))] if scores else None
+    metrics["consistency"] = compute_consistency(scores)
+
+    trend = "stable"
+    if len(scores) >= 2:
+        diff = scores[-1] - scores[-2]
+        if diff > 10: trend = "improving"
+        elif diff < -10: trend = "declining"
+    metrics["trend"] = trend
+
+    # Module 1: Recent Average (Last 3) vs Latest
+    if len(sorted_tests) >= 2:
+        recent_tests = sorted_tests[-3:] if len(sorted_tests) >= 3 else sorted_tests
+        avg_recent = sum(t["marks"]["total"] for t in recent_tests) / len(recent_tests)
+        metrics["delta_total_recent"] = round(latest_t["marks"]["total"] - avg_recent)
+
+        subjects_delta = {}
+        for sub in SUBJECTS:
+             latest_sub = latest_t["marks"].get(sub, 0)
+             recent_sub_avg = sum(t["marks"].get(sub, 0) for t in recent_tests) / len(recent_tests)
+             subjects_delta[sub] = round(latest_sub - recent_sub_avg)
+        metrics["subjects_delta"] = subjects_delta
+
+    # Module 2: spread of the last 2 tests
+    recent_n = 2
+    consistency_tests = sorted_tests[-recent_n:]
+    c_scores = [t["marks"]["total"] for t in consistency_tests]
+    c_mean = sum(c_scores) / len(c_scores) if c_scores else 0
+    metrics["c_count"] = len(c_scores)
+    metrics["c_variance"] = 0
+    metrics["c_cv"] = None
+    metrics["c_drop"] = DROP_NONE
+
+    if len(c_scores) > 1 and c_mean > 0:
+        c_variance = sum((x - c_mean) ** 2 for x in c_scores) / len(c_scores)
+        c_std_dev = math.sqrt(c_variance)
+        metrics["c_variance"] = c_variance
+        metrics["c_cv"] = c_std_dev / c_mean
+
+        # Check for ANY significant drop in the last 2 tests
+        prev_score = c_scores[-2]
+        curr_score = c_scores[-1]
+        # Check absolute drop > 15 marks
+        if (prev_score - curr_score) > 15:
+            metrics["c_drop"] = DROP_SIGNIFICANT
+        # Check percentage drop > 2%
+        elif prev_score > 0 and (prev_score - curr_score) / prev_score > 0.02:
+            metrics["c_drop"] = DROP_RECENT
+
+    # Module 4: Weighted Prediction over the last 5 tests
+    p_recency_n = 5
+    p_tests = sorted_tests[-p_recency_n:]
+    p_weights = [i+1 for i in range(len(p_tests))] # e.g., 1, 2, 3, 4, 5
+    p_weighted_sum = sum(t["marks"]["total"] * w for t, w in zip(p_tests, p_weights))
+    p_weight_total = sum(p_weights)
+    metrics["p_count"] = len(p_tests)
+    metrics["p_score_est"] = p_weighted_sum / p_weight_total if p_weight_total > 0 else 0
+
+    # Subject Contribution
+    p_subj_status = {}
+    p_overall_avg = sum(t["marks"]["total"] for t in sorted_tests) / len(sorted_tests) if sorted_tests else 0
+    p_benchmark = p_overall_avg / 4.0 # Assuming equal weightage 180/720
+    
+    for sub in SUBJECTS:
+        sub_scores = [t["marks"].get(sub, 0) for t in sorted_tests]
+        sub_avg = sum(sub_scores) / len(sub_scores) if sub_scores else 0
         
-        if happened_tests:
-            latest_t = happened_tests[-1]
-            latest_score = latest_t["marks"]["total"]
-            latest_test_id = latest_t["test_id"]
+        if sub_avg > p_benchmark * 1.05:
+            p_subj_status[sub] = "boosting"
+        elif sub_avg < p_benchmark * 0.95:
+            p_subj_status[sub] = "limiting"
         else:
-            latest_t = sorted_tests[-1]
-            latest_score = latest_t["marks"]["total"]
-            latest_test_id = latest_t["test_id"]
-
-        scores = [t["marks"]["total"] for t in sorted_tests if t["marks"].get("total") is not None]
-        avg_score = sum(scores)/len(scores) if scores else 0
-        best_score = max(scores) if scores else 0
-        consistency = compute_consistency(scores)
-        
-        trend = "stable"
-        if len(scores) >= 2:
-            diff = scores[-1] - scores[-2]
-            if diff > 10: trend = "improving"
-            elif diff < -10: trend = "declining"
-
-        subjects_data = {}
-        chapter_stats = defaultdict(lambda: defaultdict(lambda: {"total": 0, "max": 0, "count": 0, "last_perc": 0}))
-        for t in sorted_tests:
-            ntid = t["norm_tid"]
-            if ntid not in syllabus_map: continue
-            syl = syllabus_map[ntid]
-            for sub in ["physics", "chemistry", "botany", "zoology"]:
-                sub_marks = t["marks"].get(sub, 0)
-                sub_max = 180
-                chapters = syl.get(sub, {}).get('chapters', [])
-                for ch in chapters:
-                    stat = chapter_stats[sub][ch]
-                    stat["total"] += (sub_marks / len(chapters))
-                    stat["max"] += (sub_max / len(chapters))
-
-        for sub in ["physics", "chemistry", "botany", "zoology"]:
-            strong, average, weak = [], [], []
-            sub_percs = []
-            chapter_list = []
-            
-            for ch, stat in chapter_stats[sub].items():
-                perc = (stat["total"] / stat["max"] * 100) if stat["max"] > 0 else 0
-                sub_percs.append(perc)
-                
-                # 0-10 Rating Scale Logic
-                rating = round(perc / 10, 1)
-                
-                # Determine status based on rating
-                if rating >= 8.0: 
-                    strong.append(ch)
-                    status = "Mastered"
-                elif rating >= 5.0: 
-                    average.append(ch)
-                    status = "Average"
-                else: 
-                    weak.append(ch)
-                    status = "Weak"
-                    
-                chapter_list.append({
-                    "name": ch,
-                    "rating": rating,
-                    "percentage": round(perc),
-                    "status": status
-                })
-
-            # Sort chapters by rating (lowest first for focus)
-            chapter_list.sort(key=lambda x: x["rating"])
-
-            subjects_data[sub] = {
-                "average_percentage": round(sum(sub_percs)/len(sub_percs)) if sub_percs else 0,
-                "strong_chapters": strong, 
-                "average_chapters": average, 
-                "weak_chapters": weak,
-                "chapters": chapter_list
-            }
-
-        all_weak = [ch for sub in subjects_data for ch in subjects_data[sub]["weak_chapters"]]
-        profile = {
-            "psid": psid, "name": name, "batch": batch,
-            "meta": {
-                "tests_taken": len(sorted_tests),
-                "latest_test_id": latest_test_id,
-                "latest_test_order_idx": latest_t["order_idx"]
-            },
-            "overall_performance": {
-                "average_total_score": round(avg_score),
-                "best_score": best_score,
-                "latest_score": latest_score,
-                "consistency_index": consistency,
-                "trend": trend
-            },
-            "subjects": subjects_data,
-            "focus_insights": { "top_weak_chapters": all_weak[:5], "most_improved_chapters": [], "chapters_needing_attention": all_weak },
-            "tests": sorted_tests
-        }
+            p_subj_status[sub] = "neutral"
+    metrics["p_subj_status"] = p_subj_status
+    return metrics
+
+def chapter_percentages(sorted_tests, syllabus_map):
+    # Scalar reference for score_tensor.cohort_chapter_stats: each test spreads a subject's marks
+    # evenly over its syllabus chapters. Returns {sub: [(chapter, percentage), ...]} in order of
+    # first appearance.
+    chapter_stats = defaultdict(lambda: defaultdict(lambda: {"total": 0, "max": 0}))
+    for t in sorted_tests:
+        ntid = t["norm_tid"]
+        if ntid not in syllabus_map: continue
+        syl = syllabus_map[ntid]
+        for sub in SUBJECTS:
+            sub_marks = t["marks"].get(sub, 0)
+            sub_max = 180
+            chapters = syl.get(sub, {}).get('chapters', [])
+            for ch in chapters:
+                stat = chapter_stats[sub][ch]
+                stat["total"] += (sub_marks / len(chapters))
+                stat["max"] += (sub_max / len(chapters))
+    return {sub: [(ch, (stat["total"] / stat["max"] * 100) if stat["max"] > 0 else 0)
+                  for ch, stat in chapter_stats[sub].items()] for sub in SUBJECTS}
+
+def build_student(psid, info, syllabus_map, test_order, manual_names, axes, metrics=None, timer=None):
+    # timer: optional run_report.SectionTimer, charged per section of the build
+    if timer: timer.start()
+    name, batch = student_identity(psid, info, manual_names)
+
+    sorted_tests = sorted(info["tests"], key=lambda x: (x["syl_date"], x["order_idx"]))
+    if metrics is None:
+        metrics = compute_metrics(sorted_tests, test_order)
+    if timer: timer.lap("metrics")
+
+    latest_t = sorted_tests[metrics["latest_pos"]]
+    latest_score = latest_t["marks"]["total"]
+    latest_test_id = latest_t["test_id"]
+
+    avg_score = metrics["avg_score"]
+    best_score = sorted_tests[metrics["best_pos"]]["marks"]["total"] if metrics["best_pos"] is not None else 0
+    consistency = metrics["consistency"]
+    trend = metrics["trend"]
+
+    subjects_data = {}
+    chapter_percs = metrics.get("chapter_percs")
+    if chapter_percs is None:
+        chapter_percs = chapter_percentages(sorted_tests, syllabus_map)
+
+    for sub in SUBJECTS:
+        strong, average, weak = [], [], []
+        sub_percs = []
+        chapter_list = []
         
-        s_dir = os.path.join(STUDENTS_DIR, psid)
-        if not os.path.exists(s_dir): os.makedirs(s_dir)
-        with open(os.path.join(s_dir, 'profile.json'), 'w', encoding='utf-8') as f:
-            json.dump(profile, f, indent=2)
-        student_profiles.append(profile)
-
-        # Graph Generation Logic
-        graphs = []
-        graph_definitions = [
-            {"id": "all_tests_subject_trend", "title": "Overall Subject Performance (All Tests)", "filter": lambda t: True},
-            {"id": "aiats_subject_trend", "title": "AIATS Subject Performance", "filter": lambda t: "AIATS" in t["norm_tid"]},
-            {"id": "ft_subject_trend", "title": "Fortnightly Test (FT) Subject Performance", "filter": lambda t: "FT" in t["norm_tid"]},
-            {"id": "nbts_subject_trend", "title": "NCERT Booster Test (NBTS) Subject Performance", "filter": lambda t: "NBTS" in t["norm_tid"]}
-        ]
-
-        for g_def in graph_definitions:
-            filtered_tests = [t for t in sorted_tests if g_def["filter"](t)]
+        for ch, perc in chapter_percs[sub]:
+            sub_percs.append(perc)
             
-            # Skip if no tests found for this category
-            if not filtered_tests:
-                graphs.append({
-                    "graph_id": g_def["id"],
-                    "title": g_def["title"],
-                    "x_axis": {"label": "Test Date", "values": []},
-                    "datasets": []
-                })
-                continue
-
-            dates = [t["syl_date"].split("T")[0] for t in filtered_tests]
-            datasets = []
+            # 0-10 Rating Scale Logic
+            rating = round(perc / 10, 1)
             
-            for sub in ["physics", "chemistry", "botany", "zoology"]:
-                data_points = []
-                for t in filtered_tests:
-                    m = t["marks"].get(sub)
-                    # Convert to None if logic requires, but 0 is usually valid marks. 
-                    # Requirement says "If a subject mark is missing... insert null". 
-                    # get() returns None if missing, so we are good.
-                    data_points.append(m)
-                datasets.append({"subject": sub, "data": data_points})
-
-            graphs.append({
-                "graph_id": g_def["id"],
-                "title": g_def["title"],
-                "x_axis": {"label": "Test Date", "values": dates},
-                "datasets": datasets
+            # Determine status based on rating
+            if rating >= 8.0: 
+                strong.append(ch)
+                status = "Mastered"
+            elif rating >= 5.0: 
+                average.append(ch)
+                status = "Average"
+            else: 
+                weak.append(ch)
+                status = "Weak"
+                
+            chapter_list.append({
+                "name": ch,
+                "rating": rating,
+                "percentage": round(perc),
+                "status": status
             })
 
-        # Save Graphs
-        graphs_dir = os.path.join(s_dir, 'graphs')
-        if not os.path.exists(graphs_dir): os.makedirs(graphs_dir)
-        with open(os.path.join(graphs_dir, 'subject_trends.json'), 'w', encoding='utf-8') as f:
-            json.dump({"graphs": graphs}, f, indent=2)
-
-        # --- Advanced Analytics Modules ---
-        analysis_dir = os.path.join(s_dir, 'analysis')
-        if not os.path.exists(analysis_dir): os.makedirs(analysis_dir)
-
-        # Module 1: Progress Delta
-        if len(sorted_tests) >= 2:
-            earliest_t = sorted_tests[0]
-            # Latest is already identified as latest_t
-            
-            # First vs Latest
-            delta_total_first = latest_t["marks"]["total"] - earliest_t["marks"]["total"]
-            
-            # Recent Average (Last 3) vs Latest
-            recent_tests = sorted_tests[-3:] if len(sorted_tests) >= 3 else sorted_tests
-            avg_recent = sum(t["marks"]["total"] for t in recent_tests) / len(recent_tests)
-            delta_total_recent = round(latest_t["marks"]["total"] - avg_recent)
-            
-            subjects_delta = {}
-            for sub in ["physics", "chemistry", "botany", "zoology"]:
-                 latest_sub = latest_t["marks"].get(sub, 0)
-                 recent_sub_avg = sum(t["marks"].get(sub, 0) for t in recent_tests) / len(recent_tests)
-                 subjects_delta[sub] = round(latest_sub - recent_sub_avg)
-            
-            delta_data = {
-                "comparison_type": "last_3_tests_average_vs_latest",
-                "total_score_delta": delta_total_recent,
-                "first_test_delta": delta_total_first,
-                "subjects": subjects_delta
-            }
-        else:
-             delta_data = {
-                "comparison_type": "insufficient_data",
-                "total_score_delta": 0,
-                "first_test_delta": 0,
-                "subjects": {"physics": 0, "chemistry": 0, "botany": 0, "zoology": 0}
-            }
+        # Sort chapters by rating (lowest first for focus)
+        chapter_list.sort(key=lambda x: x["rating"])
 
-        with open(os.path.join(graphs_dir, 'progress_delta.json'), 'w', encoding='utf-8') as f:
-            json.dump(delta_data, f, indent=2)
+        subjects_data[sub] = {
+            "average_percentage": round(sum(sub_percs)/len(sub_percs)) if sub_percs else 0,
+            "strong_chapters": strong, 
+            "average_chapters": average, 
+            "weak_chapters": weak,
+            "chapters": chapter_list
+        }
 
-        # Module 2: Consistency Analysis
-        recent_n = 2
-        consistency_tests = sorted_tests[-recent_n:]
-        c_scores = [t["marks"]["total"] for t in consistency_tests]
-        c_mean = sum(c_scores) / len(c_scores) if c_scores else 0
+    if timer: timer.lap("chapter_stats")
+
+    all_weak = [ch for sub in subjects_data for ch in subjects_data[sub]["weak_chapters"]]
+    profile = {
+        "psid": psid, "name": name, "batch": batch,
+        "meta": {
+            "tests_taken": len(sorted_tests),
+            "latest_test_id": latest_test_id,
+            "latest_test_order_idx": latest_t["order_idx"]
+        },
+        "overall_performance": {
+            "average_total_score": round(avg_score),
+            "best_score": best_score,
+            "latest_score": latest_score,
+            "consistency_index": consistency,
+            "trend": trend
+        },
+        "subjects": subjects_data,
+        "focus_insights": { "top_weak_chapters": all_weak[:5], "most_improved_chapters": [], "chapters_needing_attention": all_weak },
+        "tests": sorted_tests
+    }
+    apply_profile_patches(profile)
+    if timer: timer.lap("profile_patches")
+
+    # Graph Generation Logic: x indices into the shared axes (AXES_FILE) and one array of marks per
+    # subject (null where a mark is missing)
+    graphs = []
+    marks_row = [[t["marks"].get(sub) for sub in SUBJECTS] for t in sorted_tests]
+    for axis, xs in zip(axes, graph_positions(info["tests"], axes)):
+        members = axis["positions"]
+        rows = [row for t, row in zip(sorted_tests, marks_row) if t["norm_tid"] in members]
+        graphs.append({"graph_id": axis["graph_id"], "x": xs, "data": [list(col) for col in zip(*rows)]})
+
+    if timer: timer.lap("graphs")
+
+    # --- Advanced Analytics Modules ---
+    # Module 1: Progress Delta
+    if len(sorted_tests) >= 2:
+        earliest_t = sorted_tests[0]
+        # Latest is already identified as latest_t
         
-        c_level = "low"
-        c_variance = 0
-        c_interpretation = "Not enough data to calculate consistency."
-
-        if len(c_scores) > 1 and c_mean > 0:
-            c_variance = sum((x - c_mean) ** 2 for x in c_scores) / len(c_scores)
-            c_std_dev = math.sqrt(c_variance)
-            cv = c_std_dev / c_mean
-            
-            # Check for ANY significant drop in the last 2 tests
-            last_two_drop = False
-            drop_reason = ""
-            
-            if len(c_scores) >= 2:
-                prev_score = c_scores[-2]
-                curr_score = c_scores[-1]
-                
-                # Check absolute drop > 15 marks
-                if (prev_score - curr_score) > 15:
-                    last_two_drop = True
-                    drop_reason = "Score dropped significantly."
-                # Check percentage drop > 2%
-                elif prev_score > 0 and (prev_score - curr_score) / prev_score > 0.02:
-                    last_two_drop = True
-                    drop_reason = "Score declined recently."
-
-            if cv < 0.10 and not last_two_drop: 
-                c_level = "high"
-                c_interpretation = "Your performance is highly stable. You consistently score near your average."
-            elif cv < 0.20 or ((cv < 0.10 or cv < 0.20) and last_two_drop):
-                c_level = "medium"
-                if last_two_drop:
-                    c_interpretation = f"{drop_reason} Consistency rating adjusted."
-                else:
-                    c_interpretation = "Your performance shows moderate fluctuations."
-            else:
-                c_level = "low"
-                c_interpretation = "Your scores are highly volatile or declining sharply."
+        # First vs Latest
+        delta_total_first = latest_t["marks"]["total"] - earliest_t["marks"]["total"]
         
-        consistency_data = {
-            "tests_considered": len(c_scores),
-            "consistency_level": c_level,
-            "variance": round(c_variance, 2),
-            "interpretation": c_interpretation
+        # Recent Average (Last 3) vs Latest
+        delta_data = {
+            "comparison_type": "last_3_tests_average_vs_latest",
+            "total_score_delta": metrics["delta_total_recent"],
+            "first_test_delta": delta_total_first,
+            "subjects": metrics["subjects_delta"]
         }
-
-        with open(os.path.join(analysis_dir, 'consistency.json'), 'w', encoding='utf-8') as f:
-            json.dump(consistency_data, f, indent=2)
-
-        # Module 3: Readiness Indicator
-        # Inputs: Trend (from profile), Consistency Level, Weak Chapters
-        r_trend = profile["overall_performance"]["trend"]
-        r_level = "needs_work"
-        r_confidence = "medium"
-        r_reasoning = "Based on your current trajectory."
-
-        if r_trend == "improving" and c_level == "high":
-            r_level = "ready"
-            r_confidence = "high"
-            r_reasoning = "You are showing consistent improvement, which is the best indicator of exam readiness."
-        elif r_trend == "improving" and c_level == "medium":
-            r_level = "ready"
-            r_confidence = "medium"
-            r_reasoning = "You are improving, though there is some fluctuation. Keep stabilizing your scores."
-        elif r_trend == "stable" and c_level == "high":
-            r_level = "moderate"
-            r_confidence = "high"
-            r_reasoning = "Your scores are stable. To be fully ready, try to push for an upward trend."
-        elif r_trend == "stable" and c_level == "medium":
-            r_level = "moderate"
-            r_confidence = "medium"
-            r_reasoning = "You are maintaining a steady pace with minor ups and downs."
-        elif r_trend == "declining":
-            r_level = "needs_work"
-            r_confidence = "high"
-            r_reasoning = "Your recent trend shows a decline. Focus on weak areas to arrest this fall immediately."
-        else: # low consistency or other combos
-            r_level = "needs_work"
-            r_confidence = "low"
-            r_reasoning = "High volatility in scores makes it hard to predict readiness. Focus on consistency."
-
-        readiness_data = {
-            "readiness_level": r_level,
-            "confidence": r_confidence,
-            "reasoning": r_reasoning
+    else:
+         delta_data = {
+            "comparison_type": "insufficient_data",
+            "total_score_delta": 0,
+            "first_test_delta": 0,
+            "subjects": {"physics": 0, "chemistry": 0, "botany": 0, "zoology": 0}
         }
 
-        with open(os.path.join(analysis_dir, 'readiness.json'), 'w', encoding='utf-8') as f:
-            json.dump(readiness_data, f, indent=2)
-
-        # Module 4: Prediction & Explainability
-        # Calculate Weighted Prediction
-        p_recency_n = 5
-        p_tests = sorted_tests[-p_recency_n:]
-        p_weights = [i+1 for i in range(len(p_tests))] # e.g., 1, 2, 3, 4, 5
-        p_weighted_sum = sum(t["marks"]["total"] * w for t, w in zip(p_tests, p_weights))
-        p_weight_total = sum(p_weights)
-        p_score_est = p_weighted_sum / p_weight_total if p_weight_total > 0 else 0
-        
-        # Determine Margin based on Consistency
-        p_margin_pct = 0.08 # Default Low
-        p_stability = "unstable"
-        if c_level == "high":
-            p_margin_pct = 0.03
-            p_stability = "stable"
-        elif c_level == "medium":
-            p_margin_pct = 0.05
-            p_stability = "moderately_stable"
-            
-        p_min = int(p_score_est * (1 - p_margin_pct))
-        p_max = int(p_score_est * (1 + p_margin_pct))
-        # Cap at 720
-        p_max = min(p_max, 720)
-        p_min = min(p_min, p_max)
-
-        # Subject Contribution
-        p_subj_status = {}
-        p_overall_avg = sum(t["marks"]["total"] for t in sorted_tests) / len(sorted_tests) if sorted_tests else 0
-        p_benchmark = p_overall_avg / 4.0 # Assuming equal weightage 180/720
-        
-        for sub in ["physics", "chemistry", "botany", "zoology"]:
-            sub_scores = [t["marks"].get(sub, 0) for t in sorted_tests]
-            sub_avg = sum(sub_scores) / len(sub_scores) if sub_scores else 0
-            
-            if sub_avg > p_benchmark * 1.05:
-                p_subj_status[sub] = "boosting"
-            elif sub_avg < p_benchmark * 0.95:
-                p_subj_status[sub] = "limiting"
+    if timer: timer.lap("module_progress_delta")
+
+    # Module 2: Consistency Analysis
+    c_level = "low"
+    c_variance = metrics["c_variance"]
+    c_interpretation = "Not enough data to calculate consistency."
+
+    if metrics["c_cv"] is not None:
+        cv = metrics["c_cv"]
+        last_two_drop = metrics["c_drop"] != DROP_NONE
+        drop_reason = DROP_REASONS[metrics["c_drop"]]
+
+        if cv < 0.10 and not last_two_drop: 
+            c_level = "high"
+            c_interpretation = "Your performance is highly stable. You consistently score near your average."
+        elif cv < 0.20 or ((cv < 0.10 or cv < 0.20) and last_two_drop):
+            c_level = "medium"
+            if last_two_drop:
+                c_interpretation = f"{drop_reason} Consistency rating adjusted."
             else:
-                p_subj_status[sub] = "neutral"
-
-        # Reasoning Generation
-        p_reasoning = []
-        p_reasoning.append(f"Based on a weighted average of your last {len(p_tests)} tests, prioritizing recent performance.")
-        if c_level == "high":
-             p_reasoning.append("Your high consistency allows for a precise prediction range.")
-        elif c_level == "low":
-             p_reasoning.append("High volatility in your scores widens the prediction range.")
-        
-        if r_trend == "improving":
-            p_reasoning.append("Your upward trend suggests potential to hit the upper bound of this range.")
-        elif r_trend == "declining":
-            p_reasoning.append("Recent score drops suggest caution; the lower bound is a realistic safety net.")
-
-        # Range Narrowing Insight
-        p_future_min = int(p_score_est * 0.97) # scenario high consistency
-        p_future_max = int(p_score_est * 1.03)
-        p_narrowing = {
-            "future_range": {"min": p_future_min, "max": min(p_future_max, 720)},
-            "condition": "If you maintain 'High' consistency for the next 3 tests."
-        }
+                c_interpretation = "Your performance shows moderate fluctuations."
+        else:
+            c_level = "low"
+            c_interpretation = "Your scores are highly volatile or declining sharply."
+    
+    consistency_data = {
+        "tests_considered": metrics["c_count"],
+        "consistency_level": c_level,
+        "variance": round(c_variance, 2),
+        "interpretation": c_interpretation
+    }
+
+    if timer: timer.lap("module_consistency")
+
+    # Module 3: Readiness Indicator
+    # Inputs: Trend (from profile), Consistency Level, Weak Chapters
+    r_trend = profile["overall_performance"]["trend"]
+    r_level = "needs_work"
+    r_confidence = "medium"
+    r_reasoning = "Based on your current trajectory."
+
+    if r_trend == "improving" and c_level == "high":
+        r_level = "ready"
+        r_confidence = "high"
+        r_reasoning = "You are showing consistent improvement, which is the best indicator of exam readiness."
+    elif r_trend == "improving" and c_level == "medium":
+        r_level = "ready"
+        r_confidence = "medium"
+        r_reasoning = "You are improving, though there is some fluctuation. Keep stabilizing your scores."
+    elif r_trend == "stable" and c_level == "high":
+        r_level = "moderate"
+        r_confidence = "high"
+        r_reasoning = "Your scores are stable. To be fully ready, try to push for an upward trend."
+    elif r_trend == "stable" and c_level == "medium":
+        r_level = "moderate"
+        r_confidence = "medium"
+        r_reasoning = "You are maintaining a steady pace with minor ups and downs."
+    elif r_trend == "declining":
+        r_level = "needs_work"
+        r_confidence = "high"
+        r_reasoning = "Your recent trend shows a decline. Focus on weak areas to arrest this fall immediately."
+    else: # low consistency or other combos
+        r_level = "needs_work"
+        r_confidence = "low"
+        r_reasoning = "High volatility in scores makes it hard to predict readiness. Focus on consistency."
 
-        prediction_output = {
-            "psid": psid,
-            "predicted_score_range": f"{p_min} - {p_max}",
-            "confidence_level": "High" if c_level == "high" else ("Medium" if c_level == "medium" else "Low"),
-            "prediction_explainability": {
-                "reasoning": p_reasoning,
-                "subject_contribution": p_subj_status,
-                "range_narrowing": p_narrowing,
-                "stability": {
-                    "level": p_stability,
-                    "explanation": f"Based on score variance of {consistency_data['variance']} across recent tests."
-                }
-            },
-            "disclaimer": "This prediction is based on statistical extrapolation of past test results and assumes consistent study patterns."
-        }
+    readiness_data = {
+        "readiness_level": r_level,
+        "confidence": r_confidence,
+        "reasoning": r_reasoning
+    }
+
+    if timer: timer.lap("module_readiness")
+
+    # Module 4: Prediction & Explainability
+    # Calculate Weighted Prediction
+    p_score_est = metrics["p_score_est"]
+    
+    # Determine Margin based on Consistency
+    p_margin_pct = 0.08 # Default Low
+    p_stability = "unstable"
+    if c_level == "high":
+        p_margin_pct = 0.03
+        p_stability = "stable"
+    elif c_level == "medium":
+        p_margin_pct = 0.05
+        p_stability = "moderately_stable"
         
-        # Save to root of student folder (matching previous observation)
-        with open(os.path.join(s_dir, 'prediction.json'), 'w', encoding='utf-8') as f:
-            json.dump(prediction_output, f, indent=2)
-
-    # Leaderboards
-    configs = [
-        {"id": "latest_scores", "metric": lambda p: p["overall_performance"]["latest_score"]},
-        {"id": "overall_average", "metric": lambda p: p["overall_performance"]["average_total_score"]},
-        {"id": "consistency_index", "metric": lambda p: p["overall_performance"]["consistency_index"]},
-    ]
-    gen_time = datetime.now().isoformat()
-    for cfg in configs:
-        sorted_p = sorted(student_profiles, key=lambda p: (cfg["metric"](p), p["overall_performance"]["latest_score"]), reverse=True)
-        entries = [{
-            "rank": r, "name": p["name"], "batch": p["batch"],
-            "psid": p["psid"], "score": cfg["metric"](p), "trend": p["overall_performance"]["trend"]
-        } for r, p in enumerate(sorted_p, 1)]
-        with open(os.path.join(LEADERBOARD_PUBLIC, f"{cfg['id']}.json"), 'w', encoding='utf-8') as f:
-            json.dump({"entries": entries, "generated_at": gen_time}, f, indent=2)
-
-    print(f"Pipeline Complete. FT08 enforced as latest baseline. Processed {len(student_profiles)} profiles.")
+    p_min = int(p_score_est * (1 - p_margin_pct))
+    p_max = int(p_score_est * (1 + p_margin_pct))
+    # Cap at 720
+    p_max = min(p_max, 720)
+    p_min = min(p_min, p_max)
+
+    # Subject Contribution
+    p_subj_status = metrics["p_subj_status"]
+
+    # Reasoning Generation
+    p_reasoning = []
+    p_reasoning.append(f"Based on a weighted average of your last {metrics['p_count']} tests, prioritizing recent performance.")
+    if c_level == "high":
+         p_reasoning.append("Your high consistency allows for a precise prediction range.")
+    elif c_level == "low":
+         p_reasoning.append("High volatility in your scores widens the prediction range.")
+    
+    if r_trend == "improving":
+        p_reasoning.append("Your upward trend suggests potential to hit the upper bound of this range.")
+    elif r_trend == "declining":
+        p_reasoning.append("Recent score drops suggest caution; the lower bound is a realistic safety net.")
+
+    # Range Narrowing Insight
+    p_future_min = int(p_score_est * 0.97) # scenario high consistency
+    p_future_max = int(p_score_est * 1.03)
+    p_narrowing = {
+        "future_range": {"min": p_future_min, "max": min(p_future_max, 720)},
+        "condition": "If you maintain 'High' consistency for the next 3 tests."
+    }
+
+    prediction_output = {
+        "psid": psid,
+        "predicted_score_range": f"{p_min} - {p_max}",
+        "confidence_level": "High" if c_level == "high" else ("Medium" if c_level == "medium" else "Low"),
+        "prediction_explainability": {
+            "reasoning": p_reasoning,
+            "subject_contribution": p_subj_status,
+            "range_narrowing": p_narrowing,
+            "stability": {
+                "level": p_stability,
+                "explanation": f"Based on score variance of {consistency_data['variance']} across recent tests."
+            }
+        },
+        "disclaimer": "This prediction is based on statistical extrapolation of past test results and assumes consistent study patterns."
+    }
+
+    if timer: timer.lap("module_prediction")
+
+    # Output files, relative to the student folder (prediction sits at the root, matching previous observation)
+    outputs = {
+        'profile.json': profile,
+        os.path.join('graphs', 'subject_trends.json'): {"axes": "/api/graphs/test_axes.json", "graphs": graphs},
+        os.path.join('graphs', 'progress_delta.json'): delta_data,
+        os.path.join('analysis', 'consistency.json'): consistency_data,
+        os.path.join('analysis', 'readiness.json'): readiness_data,
+        'prediction.json': prediction_output,
+    }
+    return outputs, summary_from_profile(profile)
+
+def write_student(psid, outputs, writer):
+    write_sections(psid, {rel_path: writer.dumps(data) for rel_path, data in outputs.items()}, writer)
+
+def write_sections(psid, raws, writer):
+    s_dir = os.path.join(STUDENTS_DIR, psid)
+    sections = {}
+    for rel_path, raw in raws.items():
+        writer.write_raw(os.path.join(s_dir, rel_path), raw)
+        sections[os.path.splitext(os.path.basename(rel_path))[0]] = raw
+    # bundle.json: every dashboard section in one fetch, spliced from the bytes written above
+    writer.write_raw(os.path.join(s_dir, 'bundle.json'), writer.join_object(sections), kind="bundle")
+
+def relabel_student(psid, identity, writer):
+    # Only the name/batch inputs changed: patch the stored profile and re-splice bundle.json
+    # instead of rebuilding the analytics. Returns the new summary, or None when a section
+    # cannot be read back (the student is then rebuilt).
+    s_dir = os.path.join(STUDENTS_DIR, psid)
+    raws = {}
+    for rel_path in STUDENT_SECTIONS:
+        raw = writer.read(os.path.join(s_dir, rel_path))
+        if raw is None: return None
+        raws[rel_path] = raw
+    profile = json.loads(raws['profile.json'])
+    profile["name"], profile["batch"] = identity
+    apply_profile_patches(profile)
+    raws['profile.json'] = writer.dumps(profile)
+    write_sections(psid, raws, writer)
+    return summary_from_profile(profile)
+
+def metrics_tensor(headers, student_map, psids, test_dates, test_order, syllabus_map):
+    # (score tensor of the listed students, FT08 column mask, chapter weights) for tensor_metrics,
+    # or None when NumPy is unavailable. headers: scan_extraction's test blocks without rows.
+    if not score_tensor.HAS_NUMPY or not psids: return None
+    sort_keys, happened_cols, norm_tids = [], [], []
+    ft_08_index = test_order.get("FT8", 999)
+    for test in headers:
+        norm_tid = normalize_tid(test['test_id'])
+        order_idx = test_order.get(norm_tid, 999)
+        sort_keys.append((test_dates.get(norm_tid, datetime(1900, 1, 1)).isoformat(), order_idx))
+        norm_tids.append(norm_tid)
+    student_rows = [zip(student_map[psid]["blocks"], (t["marks"] for t in student_map[psid]["tests"]))
+                    for psid in psids]
+    tensor = score_tensor.build_score_tensor(student_rows, sort_keys, psids)
+    for i in tensor["columns"]:
+        happened_cols.append(sort_keys[i][1] <= ft_08_index)
+    weights = score_tensor.compile_chapter_weights(syllabus_map, [norm_tids[i] for i in tensor["columns"]])
+    return tensor, happened_cols, weights
+
+def tensor_metrics(prepared, start, stop):
+    # Vectorized compute_metrics and chapter percentages for tensor rows start:stop; students the
+    # tensor cannot represent are absent from the result and go through the scalar path.
+    tensor, happened_cols, weights = prepared
+    block = score_tensor.tensor_rows(tensor, start, stop)
+    metrics_map = score_tensor.cohort_metrics(block, happened_cols)
+    for psid, chapter_percs in zip(block["psids"], score_tensor.cohort_chapter_stats(block, weights)):
+        if psid in metrics_map: metrics_map[psid]["chapter_percs"] = chapter_percs
+    return metrics_map
+
+def student_tasks(dirty, prepared):
+    # (psid, info, metrics) for each student to rebuild, in order; prepared: metrics_tensor over
+    # the same students (None: scalar path)
+    for start in range(0, len(dirty), METRICS_BLOCK):
+        block = dirty[start:start + METRICS_BLOCK]
+        metrics_map = tensor_metrics(prepared, start, start + len(block)) if prepared else {}
+        for psid, info in block:
+            yield psid, info, metrics_map.pop(psid, None)
+
+def process_student(psid, info, syllabus_map, test_order, manual_names, axes, writer, metrics=None, timer=None):
+    outputs, summary = build_student(psid, info, syllabus_map, test_order, manual_names, axes, metrics, timer)
+    write_student(psid, outputs, writer)
+    if timer: timer.lap("write_student")
+    return summary
+
+# Shared lookup tables, sent to each pool worker once through the initializer
+_worker_tables = {}
+
+def _init_worker(syllabus_map, test_order, manual_names, axes, writer_cls, writer_args):
+    _worker_tables["syllabus_map"] = syllabus_map
+    _worker_tables["test_order"] = test_order
+    _worker_tables["manual_names"] = manual_names
+    _worker_tables["axes"] = axes
+    _worker_tables["writer"] = writer_cls.from_spawn_args(writer_args)
+    _worker_tables["timer"] = SectionTimer()
+
+def _process_student_task(item):
+    psid, info, metrics = item
+    writer = _worker_tables["writer"]
+    timer = _worker_tables["timer"]
+    summary = process_student(psid, info, _worker_tables["syllabus_map"], _worker_tables["test_order"],
+                              _worker_tables["manual_names"], _worker_tables["axes"], writer, metrics, timer)
+    return summary, writer.pop_results(), timer.pop()
+
+@contextmanager
+def _no_stage(name, writer=None):
+    yield {}
+
+def file_key(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def run_pipeline(incremental=False, workers=1, vectorized=True, writer=None, raw_data=None, warm=None,
+                 report=None, test_stats=True, leaderboards=True):
+    # raw_data: extraction test blocks supplied by the caller (a list already in memory, e.g. just
+    # written by admin_ingest, or a stream such as evalyx_db.iter_extraction); default: streamed
+    # from the extraction file
+    # warm: dict kept by a long-lived caller (ingest_worker, pipeline.py --watch) between runs;
+    # holds the parsed syllabus, the aggregated extraction and the last run's state, each reused
+    # while its file is unchanged on disk
+    # report: run_report.RunReport to record stage timings in (saved to REPORT_FILE when given)
+    # test_stats: False when the caller builds tests/ itself (pipeline.py runs it as its own stage)
+    # leaderboards: False when the caller publishes the boards itself (pipeline.py's leaderboards stage)
+    print("Starting Evalyx Data Pipeline (v2.3 - Priority Fix)...")
+    warm = warm if warm is not None else {}
+    writer = writer or OutputWriter()
+    timer = SectionTimer() if report else None
+    stage = report.stage if report else _no_stage
+
+    with stage("load_syllabus") as st:
+        syllabus_key = file_key(SYLLABUS_FILE)
+        if warm.get("syllabus_key") != syllabus_key or "syllabus" not in warm:
+            warm["syllabus"] = load_syllabus(SYLLABUS_FILE)
+            warm["syllabus_key"] = syllabus_key
+        syllabus_map, test_dates, test_order = warm["syllabus"]
+        st["items"] = len(syllabus_map)
+
+    # The extraction is streamed and aggregated in one pass. From the file on disk the result is
+    # kept in warm while the file and the syllabus are the ones it was built from (a names-only
+    # change in watch mode skips straight to the relabel).
+    with stage("load_extraction") as st:
+        if raw_data is None:
+            source = extraction_source()
+            scan_key = (source, file_key(source), syllabus_key, test_stats)
+            if warm.get("scan_key") != scan_key or "scan" not in warm:
+                warm.pop("scan", None)
+                warm["scan"] = scan_extraction(iter_tests(source), test_dates, test_order, test_stats) + ({},)
+                warm["scan_key"] = scan_key
+            student_map, headers, scores, fingerprints = warm["scan"]
+        else:
+            # Handed in by the caller, so nothing derived from the file on disk applies
+            warm.pop("scan", None)
+            student_map, headers, scores = scan_extraction(raw_data, test_dates, test_order, test_stats)
+            fingerprints = {}
+        st["items"] = sum(len(info["tests"]) for info in student_map.values())
+
+    with stage("aggregate") as st:
+        axes = build_graph_axes(headers, test_dates, test_order)
+        manual_names = load_manual_names()
+        write_graph_axes(axes, writer)
+        st["items"] = len(student_map)
+
+    with stage("fingerprint") as st:
+        prev_state = {}
+        if incremental:
+            if warm.get("state_key") == (file_key(STATE_FILE), json.dumps(writer.config())):
+                prev_state = warm["state"]
+            else:
+                prev_state = load_state(writer.config())
+        # new_state keeps student_map order, so leaderboard tie order matches a serial run
+        new_state = {}
+        dirty = []
+        relabel = []
+        for psid, info in student_map.items():
+            fingerprint = fingerprints.get(psid)
+            if fingerprint is None:
+                fingerprint = fingerprints[psid] = student_fingerprint(psid, info, syllabus_map, test_order, axes)
+            identity = student_identity(psid, info, manual_names)
+            new_state[psid] = entry = {"fingerprint": fingerprint, "identity": identity, "summary": None}
+            prev = prev_state.get(psid)
+            if prev and prev["fingerprint"] == fingerprint and \
+               writer.exists(os.path.join(STUDENTS_DIR, psid, 'profile.json')):
+                if prev.get("identity") == identity:
+                    entry["summary"] = prev["summary"]
+                else:
+                    relabel.append(psid)
+            else:
+                dirty.append((psid, info))
+        st["items"] = len(dirty)
+
+    # Name/batch-only changes (e.g. manual_names.json) patch the stored profiles
+    relabeled = 0
+    with stage("relabel", writer) as st:
+        for psid in relabel:
+            summary = relabel_student(psid, new_state[psid]["identity"], writer)
+            if summary is None:
+                dirty.append((psid, student_map[psid]))
+            else:
+                new_state[psid]["summary"] = summary
+                relabeled += 1
+        st["items"] = relabeled
+
+    # The tensor is built here; its per-student metrics are taken a block at a time in the
+    # students stage (student_tasks)
+    with stage("tensor_metrics") as st:
+        prepared = metrics_tensor(headers, student_map, [psid for psid, _ in dirty], test_dates, test_order,
+                                  syllabus_map) if vectorized else None
+        st["items"] = len(dirty) if prepared else 0
+        # The task generator holds the only reference, so the tensor goes with it
+        tasks = student_tasks(dirty, prepared)
+        del prepared
+
+    with stage("students", writer) as st:
+        if workers > 1 and len(dirty) > 1:
+            chunksize = max(1, len(dirty) // (workers * 8))
+            initargs = (syllabus_map, test_order, manual_names, axes, type(writer), writer.spawn_args())
+            with Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+                for summary, results, timings in pool.imap_unordered(_process_student_task, tasks, chunksize=chunksize):
+                    new_state[summary.psid]["summary"] = summary
+                    writer.merge_results(results)
+                    if timer: timer.merge(timings)
+        else:
+            for psid, info, metrics in tasks:
+                new_state[psid]["summary"] = process_student(psid, info, syllabus_map, test_order, manual_names,
+                                                             axes, writer, metrics, timer)
+        st["items"] = len(dirty)
+
+    # Leaderboards are cohort-wide, so they are always refreshed
+    summaries = [entry["summary"] for entry in new_state.values()]
+    if leaderboards:
+        with stage("leaderboards", writer) as st:
+            write_boards(summaries, writer)
+            st["items"] = len(summaries)
+
+    with stage("students_index", writer) as st:
+        writer.write(INDEX_FILE, [index_entry(s) for s in summaries], kind="students_index")
+        st["items"] = len(summaries)
+    # Boards and index only cover the students built from the extraction
+    dropped = unsummarized_profiles(summaries, STUDENTS_DIR)
+    if dropped:
+        outputs = "students_index and leaderboards" if leaderboards else "students_index"
+        print(f"{outputs} leave out {len(dropped)} student folders not in the current extraction.")
+
+    # Per-test distributions and standings (cohort-wide as well)
+    if test_stats:
+        with stage("test_stats", writer) as st:
+            st["items"] = write_test_stats(scores, writer)
+
+    with stage("flush_writes") as st:
+        writer.close()
+        st["items"] = sum(stat["files"] for stat in writer.stats.values())
+
+    with stage("save_state") as st:
+        # Cohort summary store read by leaderboards_v3 and the students index
+        write_summary_store(summaries)
+        save_state(new_state, writer.config())
+        if isinstance(writer, DbWriter): save_metrics(writer.conn, new_state)
+        warm["state"] = new_state
+        warm["state_key"] = (file_key(STATE_FILE), json.dumps(writer.config()))
+        st["items"] = len(new_state)
+    writer.report()
+
+    if report:
+        report.add_sections(timer)
+        report.finish(REPORT_FILE, writer)
+        report.print_summary()
+
+    if incremental:
+        print(f"Incremental run: rebuilt {len(dirty)} profiles, relabeled {relabeled}, "
+              f"{len(summaries) - len(dirty) - relabeled} unchanged.")
+    print(f"Pipeline Complete. FT08 enforced as latest baseline. Processed {len(summaries)} profiles.")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Evalyx analytics pipeline")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only rebuild students whose inputs changed since the last run")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes for the per-student pass (0 = all cores)")
+    parser.add_argument("--scalar", action="store_true",
+                        help="compute metrics per student instead of over the NumPy score tensor")
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json",
+                        help="json: read the extraction (.json or .ndjson) and write public/api; "
+                             "sqlite: read and write the database (publish with evalyx_db.py export)")
+    parser.add_argument("--db", default=DB_FILE, help="database file for --backend sqlite")
+    parser.add_argument("--no-report", action="store_true",
+                        help=f"do not write the stage timing report ({REPORT_FILE})")
+    parser.add_argument("--cprofile", nargs="?", const=PROFILE_FILE, metavar="PATH",
+                        help=f"also dump cProfile stats of the main process (default path: {PROFILE_FILE})")
+    add_output_args(parser)
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
-    run_pipeline()
+    args = parse_args()
+    workers = args.workers or os.cpu_count() or 1
+    report = None if args.no_report else RunReport("evalyx_engine", {
+        "incremental": args.incremental, "workers": workers, "vectorized": not args.scalar,
+        "compact": args.compact, "precompress": args.precompress, "io_threads": args.io_threads})
+    profiler = None
+    if args.cprofile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    if args.backend == "sqlite":
+        writer = DbWriter(compact=args.compact, skip_unchanged=not args.force_write, db_path=args.db)
+        raw_data = iter_db_extraction(writer.conn)
+    else:
+        writer, raw_data = writer_from_args(args), None
+    run_pipeline(incremental=args.incremental, workers=workers, vectorized=not args.scalar,
+                 writer=writer, raw_data=raw_data, report=report)
+    if profiler:
+        profiler.disable()
+        if os.path.dirname(args.cprofile): os.makedirs(os.path.dirname(args.cprofile), exist_ok=True)
+        profiler.dump_stats(args.cprofile)
+        print(f"cProfile stats written to {args.cprofile} (python -m pstats {args.cprofile})")
@@ -0,0 +1,185 @@
+import os
+import re
+import json
+import argparse
+
+from output_writer import write_atomic
+from test_index import normalize_tid
+
+# Streaming access to the extraction (every test block with its student rows). Two formats, read
+# the same way:
+#
+#   extraction_results.json     one JSON array of test blocks (the original format)
+#   extraction_results.ndjson   one test block per line, in the same order. admin_ingest appends
+#                               a line per batch instead of rewriting the file. Rows for a test
+#                               already in the file go on a continuation line,
+#                               {"continues": <test_id>, "students": [...]}, which adds them to the
+#                               block of that test (where the JSON path's ingest puts them).
+#
+# In both formats a test has exactly one block: a second block with the same (normalized) test ID
+# is rejected with a ValueError rather than merged or kept apart, so both formats read back the
+# same blocks and converting between them is lossless.
+#
+# When the .ndjson file exists it is the extraction. iter_tests() yields one test block at a time,
+# so callers keep only what they aggregate from the rows, never the whole archive.
+#
+#   python extraction_store.py convert --to ndjson   switch an existing JSON extraction over
+#   python extraction_store.py convert --to json     and back
+EXTRACTION_FILE = os.path.join('public', 'api', 'extraction_results.json')
+EXTRACTION_LOG = os.path.join('public', 'api', 'extraction_results.ndjson')
+
+CHUNK_SIZE = 1 << 20
+NON_WS = re.compile(r'\S')
+# Lines are written with test_id (or continues) first, so a line's test is known without decoding
+# its rows
+LINE_HEAD = re.compile(rb'\{\s*"(test_id|continues)"\s*:\s*("(?:[^"\\]|\\.)*")')
+
+def extraction_source():
+    return EXTRACTION_LOG if os.path.exists(EXTRACTION_LOG) else EXTRACTION_FILE
+
+def iter_tests(path=None):
+    # Test blocks of the extraction in file order; path defaults to extraction_source()
+    path = path or extraction_source()
+    seen = {}
+    for block in (_iter_lines(path) if path.endswith('.ndjson') else _iter_json_file(path)):
+        norm_tid = normalize_tid(block['test_id'])
+        if norm_tid in seen:
+            raise ValueError(f"Test {block['test_id']} has two blocks in {path} (the first is {seen[norm_tid]}); "
+                             "merge their students into one block")
+        seen[norm_tid] = block['test_id']
+        yield block
+
+def _iter_json_file(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        yield from _iter_json_array(f)
+
+def _iter_json_array(f):
+    # Incremental decode of a top-level JSON array: elements are parsed one at a time and the
+    # buffer only holds the unparsed rest, so memory follows the largest test block
+    decoder = json.JSONDecoder()
+    buf, pos = f.read(CHUNK_SIZE), 0
+    eof = not buf
+    expect = '['  # '[' -> 'first' (value or ']') -> 'sep' (',' or ']') -> 'value' -> 'sep' ...
+    while True:
+        m = NON_WS.search(buf, pos)
+        if m is None:
+            if eof: raise ValueError("Truncated extraction file: the JSON array is not closed")
+            buf, pos = f.read(CHUNK_SIZE), 0
+            eof = not buf
+            continue
+        pos = m.start()
+        ch = buf[pos]
+        if expect == '[':
+            if ch != '[': raise ValueError("Extraction file is not a JSON array")
+            pos, expect = pos + 1, 'first'
+            continue
+        if expect in ('first', 'sep') and ch == ']': return
+        if expect == 'sep':
+            if ch != ',': raise ValueError(f"Malformed extraction file: expected ',' or ']', got {ch!r}")
+            pos, expect = pos + 1, 'value'
+            continue
+        try:
+            block, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof: raise
+            # Block not complete yet: read at least as much again, so a large block is re-parsed
+            # only a logarithmic number of times
+            more = f.read(max(CHUNK_SIZE, len(buf) - pos))
+            buf, pos, eof = buf[pos:] + more, 0, not more
+            continue
+        yield block
+        pos, expect = end, 'sep'
+
+def _line_head(line):
+    # (is_continuation, norm_tid) of a line
+    m = LINE_HEAD.match(line)
+    if m: return m.group(1) == b'continues', normalize_tid(json.loads(m.group(2)))
+    part = json.loads(line)
+    return 'continues' in part, normalize_tid(part.get('continues', part.get('test_id')))
+
+def _iter_lines(path):
+    # First pass: the line offsets of each block in file order, continuation lines attached to
+    # the block of their test (only the head of each line is decoded). Second pass: each block
+    # read and extended with its continuations. A repeated test line stays a block of its own
+    # for iter_tests to reject.
+    blocks, first = [], {}
+    with open(path, 'rb') as f:
+        offset = 0
+        for line in f:
+            if not line.endswith(b'\n'):
+                # Cut off by a crash while appending; append_test drops it on the next write
+                print(f"Warning: ignoring an incomplete last line in {path}")
+                break
+            if line.strip():
+                continuation, norm_tid = _line_head(line)
+                if continuation and norm_tid in first:
+                    first[norm_tid].append(offset)
+                else:
+                    blocks.append([offset])
+                    first.setdefault(norm_tid, blocks[-1])
+            offset += len(line)
+        for offsets in blocks:
+            block = None
+            for offset in offsets:
+                f.seek(offset)
+                part = json.loads(f.readline())
+                if block is None:
+                    # A continuation with no block before it stands in for one
+                    if 'continues' in part: part = {"test_id": part['continues'], "students": part['students']}
+                    block = part
+                else:
+                    block['students'].extend(part['students'])
+            yield block
+
+def encode_line(block):
+    # One .ndjson line (a block or a continuation); its test leads so _line_head can read it
+    lead = 'continues' if 'continues' in block else 'test_id'
+    block = {lead: block[lead], **block}
+    return json.dumps(block, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+
+def append_test(block, path=EXTRACTION_LOG):
+    # Appends one block (a new test) or continuation (more rows for a test already in the file)
+    # in a single write. An incomplete last line left by an interrupted append is dropped first.
+    out_dir = os.path.dirname(path)
+    if out_dir: os.makedirs(out_dir, exist_ok=True)
+    with open(path, 'ab+') as f:
+        end = f.seek(0, os.SEEK_END)
+        if end:
+            f.seek(end - 1)
+            if f.read(1) != b'\n':
+                # Back to just after the last complete line
+                while end > 0:
+                    step = min(CHUNK_SIZE, end)
+                    end -= step
+                    f.seek(end)
+                    nl = f.read(step).rfind(b'\n')
+                    if nl >= 0:
+                        end += nl + 1
+                        break
+                f.truncate(end)
+        f.write(encode_line(block))
+        f.flush()
+        os.fsync(f.fileno())
+
+def write_extraction(blocks, path):
+    # Whole extraction in either format (atomic replace)
+    if path.endswith('.ndjson'):
+        data = b''.join(encode_line(block) for block in blocks)
+    else:
+        data = json.dumps(list(blocks), indent=2).encode('utf-8')
+    write_atomic(path, data)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert the extraction between the JSON and NDJSON formats")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_convert = sub.add_parser("convert", help="rewrite the extraction in the other format")
+    p_convert.add_argument("--to", choices=["ndjson", "json"], required=True)
+    p_convert.add_argument("--keep", action="store_true", help="keep the source file (it is removed by default)")
+    args = parser.parse_args()
+
+    source, target = (EXTRACTION_FILE, EXTRACTION_LOG) if args.to == "ndjson" else (EXTRACTION_LOG, EXTRACTION_FILE)
+    if not os.path.exists(source): raise SystemExit(f"{source} not found")
+    write_extraction(iter_tests(source), target)
+    # The .ndjson file takes precedence when both exist, so keeping both is only for a backup
+    if not args.keep: os.remove(source)
+    print(f"Extraction written to {target}" + ("" if args.keep else f" ({source} removed)"))
@@ -0,0 +1,75 @@
+import os
+import json
+import gzip
+import hashlib
+
+from output_writer import write_atomic
+
+# Content-addressed cache of rows parsed from result PDFs, so re-uploading the same file
+# (after a failed run or a wrong test_id) skips PDF extraction entirely.
+#
+# One entry per (PDF bytes, parser version and mode): <sha256>.rows.gz holding
+#   {"fields": [...], "rows": [[...], ...]}  (missing values stored as null)
+# Entries are evicted least-recently-used first once the directory exceeds max_bytes;
+# a hit refreshes the entry's mtime.
+CACHE_DIR = os.path.join('temp_uploads', 'parse_cache')
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+ROW_FIELDS = ["psid", "physics", "chemistry", "botany", "zoology", "total", "center_rank", "air_rank", "percentile"]
+SUFFIX = '.rows.gz'
+
+def file_digest(path, salt=""):
+    h = hashlib.sha256(salt.encode('utf-8'))
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def pack_rows(rows):
+    packed = {"fields": ROW_FIELDS, "rows": [[r.get(f) for f in ROW_FIELDS] for r in rows]}
+    return gzip.compress(json.dumps(packed, separators=(',', ':')).encode('utf-8'), mtime=0)
+
+def unpack_rows(raw):
+    packed = json.loads(gzip.decompress(raw))
+    fields = packed["fields"]
+    return [{f: v for f, v in zip(fields, row) if v is not None} for row in packed["rows"]]
+
+class ParseCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + SUFFIX)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                rows = unpack_rows(f.read())
+        except (OSError, ValueError, KeyError):
+            return None
+        os.utime(path)
+        return rows
+
+    def put(self, key, rows):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        write_atomic(self._path(key), pack_rows(rows))
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(SUFFIX): continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes: break
+            try:
+                os.unlink(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+            total -= size
@@ -0,0 +1,180 @@
+import os
+import json
+import time
+import argparse
+import threading
+import importlib.util
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from admin_ingest import log, set_log_sink, extract_rows, ingest_and_refresh
+from output_writer import write_atomic
+
+# Long-lived ingest worker. The admin ingest route drops jobs into a spool directory and
+# returns at once; this process picks them up, keeps pdfplumber, the syllabus and the
+# engine state (per-student summaries) warm between jobs, and publishes each job's status
+# for the route to poll.
+#
+#   temp_uploads/jobs/queue/<job_id>.json    submitted jobs (written by route.js)
+#   temp_uploads/jobs/running/<job_id>.json  claimed jobs (moved back to queue on restart)
+#   temp_uploads/jobs/status/<job_id>.json   state, page progress and log lines per job
+#   temp_uploads/jobs/worker.json            heartbeat; route.js falls back to exec when stale
+JOBS_DIR = os.path.join('temp_uploads', 'jobs')
+QUEUE_DIR = os.path.join(JOBS_DIR, 'queue')
+RUNNING_DIR = os.path.join(JOBS_DIR, 'running')
+STATUS_DIR = os.path.join(JOBS_DIR, 'status')
+HEARTBEAT_FILE = os.path.join(JOBS_DIR, 'worker.json')
+HEARTBEAT_INTERVAL = 2.0
+MAX_LOG_LINES = 500
+
+def now():
+    return datetime.now().isoformat()
+
+class JobStatus:
+    def __init__(self, job):
+        self.path = os.path.join(STATUS_DIR, job["job_id"] + '.json')
+        self.lock = threading.Lock()
+        self.data = {
+            "job_id": job["job_id"],
+            "test_id": job.get("test_id"),
+            "state": "queued",
+            "submitted_at": job.get("submitted_at"),
+            "started_at": None,
+            "finished_at": None,
+            "progress": {"pages_done": 0, "pages": None},
+            "updated": None,
+            "error": None,
+            "logs": [],
+        }
+
+    def _save(self):
+        write_atomic(self.path, json.dumps(self.data).encode('utf-8'))
+
+    def update(self, **fields):
+        with self.lock:
+            self.data.update(fields)
+            self._save()
+
+    def log(self, msg):
+        with self.lock:
+            self.data["logs"] = (self.data["logs"] + [msg])[-MAX_LOG_LINES:]
+            self._save()
+
+    def progress(self, pages_done, pages):
+        self.update(progress={"pages_done": pages_done, "pages": pages})
+
+class IngestWorker:
+    def __init__(self, concurrency=2, poll_interval=0.5):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+        # Parsing runs concurrently; writing the extraction and the analytics refresh
+        # are serialized so every job commits on top of the previous one
+        self.commit_lock = threading.Lock()
+        # Engine data reused across refreshes (see evalyx_engine.run_pipeline); guarded by commit_lock
+        self.warm = {}
+        self.active = set()
+        self.active_lock = threading.Lock()
+        self.last_heartbeat = 0
+
+    def recover(self):
+        # Jobs claimed by a worker that died are queued again
+        for name in os.listdir(RUNNING_DIR):
+            os.replace(os.path.join(RUNNING_DIR, name), os.path.join(QUEUE_DIR, name))
+
+    def heartbeat(self):
+        if time.time() - self.last_heartbeat < HEARTBEAT_INTERVAL: return
+        self.last_heartbeat = time.time()
+        with self.active_lock:
+            running = sorted(self.active)
+        write_atomic(HEARTBEAT_FILE, json.dumps({
+            "pid": os.getpid(),
+            "updated_at": now(),
+            "concurrency": self.concurrency,
+            "running": running,
+        }).encode('utf-8'))
+
+    def claim_jobs(self):
+        # Oldest first (job ids start with the submit timestamp); only as many as there are free slots
+        for name in sorted(os.listdir(QUEUE_DIR)):
+            if not name.endswith('.json'): continue
+            with self.active_lock:
+                if len(self.active) >= self.concurrency: return
+            src = os.path.join(QUEUE_DIR, name)
+            dst = os.path.join(RUNNING_DIR, name)
+            try:
+                os.replace(src, dst)
+                with open(dst, 'r', encoding='utf-8') as f:
+                    job = json.load(f)
+            except (OSError, ValueError) as e:
+                log(f"Skipping unreadable job {name}: {e}")
+                continue
+            job["job_id"] = name[:-len('.json')]
+            with self.active_lock:
+                self.active.add(job["job_id"])
+            self.executor.submit(self.run_job, job, dst)
+
+    def run_job(self, job, claim_path):
+        status = JobStatus(job)
+        set_log_sink(status.log)
+        try:
+            status.update(state="parsing", started_at=now())
+            log(f"Job {job['job_id']}: {job['test_id']} ({os.path.basename(job['pdf_path'])})")
+            log("Stage 1: PDF Extraction")
+            results = extract_rows(job["pdf_path"], job.get("parser", "table"), job.get("validate", False),
+                                   progress=status.progress)
+            if not results:
+                log("No data found in PDF. Check format or ensure table headers match (PSID, Phy, Chem, Bot, Zoo).")
+                status.update(state="failed", error="No data found in PDF", finished_at=now())
+                return
+            log(f"Found {len(results)} rows.")
+
+            status.update(state="waiting")
+            with self.commit_lock:
+                status.update(state="ingesting")
+                touched = ingest_and_refresh(results, job["test_id"], job["test_type"], job["test_date"],
+                                             float(job["max_marks"]), warm=self.warm,
+                                             backend=job.get("backend", "json"))
+            status.update(state="done", updated=len(touched), finished_at=now())
+        # SystemExit: admin_ingest.check_dependencies exits when pdfplumber is missing
+        except (Exception, SystemExit) as e:
+            logs = status.data["logs"]
+            error = str(e) if isinstance(e, Exception) else (logs[-1] if logs else "Ingest stopped unexpectedly")
+            log(f"Job failed: {error}")
+            status.update(state="failed", error=error, finished_at=now())
+        finally:
+            set_log_sink(None)
+            if os.path.exists(claim_path): os.unlink(claim_path)
+            with self.active_lock:
+                self.active.discard(job["job_id"])
+
+    def run(self):
+        for d in (QUEUE_DIR, RUNNING_DIR, STATUS_DIR):
+            os.makedirs(d, exist_ok=True)
+        self.recover()
+        # Pay the pdfplumber import once, not per upload
+        if importlib.util.find_spec("pdfplumber") is not None:
+            import pdfplumber
+        log(f"Ingest worker {os.getpid()} watching {QUEUE_DIR} (concurrency {self.concurrency})")
+        try:
+            while True:
+                self.heartbeat()
+                self.claim_jobs()
+                time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            log("Stopping ingest worker...")
+        finally:
+            self.executor.shutdown(wait=True)
+            if os.path.exists(HEARTBEAT_FILE): os.unlink(HEARTBEAT_FILE)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Resident worker for admin PDF ingest jobs")
+    parser.add_argument("--concurrency", type=int, default=2,
+                        help="jobs parsed at the same time (ingestion itself is always one at a time)")
+    parser.add_argument("--poll", type=float, default=0.5,
+                        help="seconds between checks of the job queue")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    IngestWorker(concurrency=max(1, args.concurrency), poll_interval=args.poll).run()
@@ -1,53 +1,100 @@
 import json
 import os
 import glob
+import hashlib
+import argparse
 from datetime import datetime
 
+from output_writer import OutputWriter, add_output_args, writer_from_args
+from cohort_summary import SUMMARY_FILE, summary_from_profile, read_summary_store, unsummarized_profiles
+
 STUDENTS_ROOT = r'public/api/students'
 OUTPUT_PUBLIC = os.path.join('public', 'api', 'leaderboards', 'public')
 OUTPUT_PRIVATE = os.path.join('public', 'api', 'leaderboards', 'private')
 
-if not os.path.exists(OUTPUT_PUBLIC): os.makedirs(OUTPUT_PUBLIC)
-if not os.path.exists(OUTPUT_PRIVATE): os.makedirs(OUTPUT_PRIVATE)
+# Paged layout: <id>/meta.json, <id>/page_<n>.json (n from 1) and <id>/ranks/<nn>.json, a
+# key -> [rank, page] index sharded by the key's last two characters. Private boards are keyed by
+# PSID; public boards by lookup_key(psid), so no full PSID is published under leaderboards/public.
+PAGE_SIZE = 100
+
+BOARDS = [
+    {"id": "latest_scores", "type": "per_test_latest", "metric": lambda p: p.latest_score},
+    {"id": "overall_average", "type": "overall_average", "metric": lambda p: p.average_total_score},
+    {"id": "consistency_index", "type": "consistency_index", "metric": lambda p: p.consistency_index},
+    {"id": "subject_physics", "type": "subject_wise", "subject": "physics", "metric": lambda p: p.physics},
+    {"id": "subject_chemistry", "type": "subject_wise", "subject": "chemistry", "metric": lambda p: p.chemistry},
+    {"id": "subject_botany", "type": "subject_wise", "subject": "botany", "metric": lambda p: p.botany},
+    {"id": "subject_zoology", "type": "subject_wise", "subject": "zoology", "metric": lambda p: p.zoology},
+]
+BOARD_IDS = [cfg["id"] for cfg in BOARDS]
 
 def get_trend_val(trend):
     order = {"improving": 4, "stable": 3, "declining": 2, "insufficient_data": 1}
     return order.get(trend, 0)
 
-def generate():
+def lookup_key(psid):
+    # Public rank index key; src/lib/leaderboards.js derives the same one from the signed-in PSID
+    return hashlib.sha256(psid.encode('utf-8')).hexdigest()[:16]
+
+def write_board(writer, out_dir, board_id, payload, index_keys=None, kind="leaderboard"):
+    # Writes the full board (kept for existing consumers) plus its paged form. index_keys (one per
+    # entry) adds the rank index; shards left from an earlier run are removed.
+    entries = payload["entries"]
+    writer.write(os.path.join(out_dir, f"{board_id}.json"), payload, kind=kind)
+
+    board_dir = os.path.join(out_dir, board_id)
+    pages = max(1, (len(entries) + PAGE_SIZE - 1) // PAGE_SIZE)
+    meta = {k: v for k, v in payload.items() if k != "entries"}
+    meta.update({
+        "leaderboard_id": board_id,
+        "count": len(entries),
+        "page_size": PAGE_SIZE,
+        "pages": pages,
+        "batches": sorted({e["batch"] for e in entries if e.get("batch")}),
+    })
+    writer.write(os.path.join(board_dir, "meta.json"), meta, kind=kind + "_meta")
+    for page in range(1, pages + 1):
+        chunk = entries[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+        writer.write(os.path.join(board_dir, f"page_{page}.json"),
+                     {"leaderboard_id": board_id, "page": page, "entries": chunk}, kind=kind + "_page")
+
+    shards = {}
+    for i, (e, key) in enumerate(zip(entries, index_keys or [])):
+        shards.setdefault(key[-2:], {})[key] = [e["rank"], i // PAGE_SIZE + 1]
+    ranks_dir = os.path.join(board_dir, "ranks")
+    for shard, index in shards.items():
+        writer.write(os.path.join(ranks_dir, f"{shard}.json"), index, kind=kind + "_ranks")
+    for name in writer.listdir(ranks_dir):
+        if name.endswith(".json") and name[:-5] not in shards: writer.remove(os.path.join(ranks_dir, name))
+
+def load_profile_summaries():
+    # Slow path: parse every profile.json (also picks up student folders the engine no longer builds)
     student_dirs = [d for d in glob.glob(os.path.join(STUDENTS_ROOT, "*")) if os.path.isdir(d)]
-    profiles = []
+    summaries = []
     
     for s_dir in student_dirs:
         p_path = os.path.join(s_dir, 'profile.json')
         if not os.path.exists(p_path): continue
         with open(p_path, 'r', encoding='utf-8') as f:
-            profiles.append(json.load(f))
-            
+            summaries.append(summary_from_profile(json.load(f)))
+    return summaries
+
+def write_boards(summaries, writer):
+    # Every private and public board. The only writer of leaderboards/ (evalyx_engine and the
+    # pipeline's leaderboards stage both come through here).
     gen_time = datetime.now().isoformat()
-    
-    configs = [
-        {"id": "latest_scores", "type": "per_test_latest", "metric": lambda p: p["overall_performance"]["latest_score"]},
-        {"id": "overall_average", "type": "overall_average", "metric": lambda p: p["overall_performance"]["average_total_score"]},
-        {"id": "consistency_index", "type": "consistency_index", "metric": lambda p: p["overall_performance"].get("consistency_index", 0)},
-        {"id": "subject_physics", "type": "subject_wise", "subject": "physics", "metric": lambda p: p["subjects"]["physics"]["average_percentage"]},
-        {"id": "subject_chemistry", "type": "subject_wise", "subject": "chemistry", "metric": lambda p: p["subjects"]["chemistry"]["average_percentage"]},
-        {"id": "subject_botany", "type": "subject_wise", "subject": "botany", "metric": lambda p: p["subjects"]["botany"]["average_percentage"]},
-        {"id": "subject_zoology", "type": "subject_wise", "subject": "zoology", "metric": lambda p: p["subjects"]["zoology"]["average_percentage"]},
-    ]
-    
-    for cfg in configs:
+    for cfg in BOARDS:
         def sort_key(p):
             metric_val = cfg["metric"](p)
             # Tie breakers
             return (
                 metric_val, 
-                p["overall_performance"]["best_score"], 
-                p["meta"]["tests_taken"], 
-                get_trend_val(p["overall_performance"]["trend"])
+                p.best_score, 
+                p.tests_taken, 
+                get_trend_val(p.trend)
             )
             
-        sorted_profiles = sorted(profiles, key=sort_key, reverse=True)
+        sorted_profiles = sorted(summaries, key=sort_key, reverse=True)
         
         priv = []
         pub = []
@@ -57,22 +104,40 @@ def generate():
             
             common = {
                 "rank": rank,
-                "name": p.get("name", "Unknown"),
-                "batch": p.get("batch", "N/A"),
+                "name": p.name,
+                "batch": p.batch,
                 "score": score,
-                "trend": p["overall_performance"]["trend"]
+                "trend": p.trend
             }
             
-            priv.append({**common, "psid": p["psid"]})
-            pub.append({**common, "psid": "*******" + p["psid"][-3:]})
-            
-        with open(os.path.join(OUTPUT_PRIVATE, f"{cfg['id']}.json"), 'w', encoding='utf-8') as f:
-            json.dump({"leaderboard_id": cfg["id"], "type": cfg["type"], "generated_at": gen_time, "entries": priv}, f, indent=2)
+            priv.append({**common, "psid": p.psid})
+            pub.append({**common, "psid": "*******" + p.psid[-3:]})
             
-        with open(os.path.join(OUTPUT_PUBLIC, f"{cfg['id']}.json"), 'w', encoding='utf-8') as f:
-            json.dump({"leaderboard_id": cfg["id"], "type": cfg["type"], "generated_at": gen_time, "entries": pub}, f, indent=2)
+        write_board(writer, OUTPUT_PRIVATE, cfg["id"],
+                    {"leaderboard_id": cfg["id"], "type": cfg["type"], "generated_at": gen_time, "entries": priv},
+                    index_keys=[p.psid for p in sorted_profiles], kind="leaderboard_private")
             
+        write_board(writer, OUTPUT_PUBLIC, cfg["id"],
+                    {"leaderboard_id": cfg["id"], "type": cfg["type"], "generated_at": gen_time, "entries": pub},
+                    index_keys=[lookup_key(p.psid) for p in sorted_profiles], kind="leaderboard_public")
+
+def generate(writer=None, from_profiles=False):
+    writer = writer or OutputWriter()
+    if from_profiles or not os.path.exists(SUMMARY_FILE):
+        profiles = load_profile_summaries()
+    else:
+        profiles = read_summary_store()
+    write_boards(profiles, writer)
     print(f"Leaderboards regenerated for {len(profiles)} students.")
+    dropped = unsummarized_profiles(profiles, STUDENTS_ROOT)
+    if dropped: print(f"Left out {len(dropped)} student folders with no summary (not in the current extraction).")
+    writer.close()
+    writer.report()
 
 if __name__ == "__main__":
-    generate()
+    parser = argparse.ArgumentParser(description="Regenerate public/private leaderboards from the cohort summary store")
+    parser.add_argument("--from-profiles", action="store_true",
+                        help="rebuild from every students/*/profile.json instead of the summary store")
+    add_output_args(parser)
+    args = parser.parse_args()
+    generate(writer_from_args(args), from_profiles=args.from_profiles)
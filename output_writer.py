@@ -0,0 +1,261 @@
+import os
+import json
+import gzip
+import fcntl
+import hashlib
+import tempfile
+import threading
+import importlib.util
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# Brotli is optional; without it ".json.br" siblings are skipped
+HAS_BROTLI = importlib.util.find_spec("brotli") is not None
+
+COMPRESSIONS = ("gz", "br")
+
+# path -> [sha1 of what was written, mtime_ns after writing]; shared by every script writing public/api.
+# Kept under data/ so it is not served along with the files it describes
+DEFAULT_MANIFEST = os.path.join('data', 'write_manifest.json')
+
+def _empty_stat():
+    return {"files": 0, "unchanged": 0, "bytes": 0, "gz_bytes": 0, "br_bytes": 0}
+
+def write_atomic(path, data):
+    # Temp file in the same directory + rename, so readers never see a half-written file
+    out_dir = os.path.dirname(path) or '.'
+    fd, tmp = tempfile.mkstemp(dir=out_dir, prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp): os.unlink(tmp)
+        raise
+
+class OutputWriter:
+    # Single JSON writer for everything under public/api. Default output matches the
+    # historical json.dump(..., indent=2); compact drops indentation and whitespace.
+    # precompress adds deterministic .json.gz / .json.br siblings for the static server.
+    #
+    # Files whose bytes match the manifest entry (and were not touched since) are skipped,
+    # every write is atomic, and with io_threads > 0 the disk writes run on a bounded
+    # thread pool while the caller keeps computing. Call close() to wait for pending
+    # writes and persist the manifest.
+
+    def __init__(self, compact=False, precompress=(), manifest_path=None, io_threads=0, skip_unchanged=True):
+        self.compact = compact
+        self.precompress = tuple(c for c in precompress if c != "br" or HAS_BROTLI)
+        if "br" in precompress and not HAS_BROTLI:
+            print("Warning: 'brotli' not installed, skipping .json.br output. pip install brotli")
+        self.stats = defaultdict(_empty_stat)
+        self.skip_unchanged = skip_unchanged
+        self.manifest_path = manifest_path
+        self.manifest = self._load_manifest() if manifest_path else {}
+        self.manifest_updates = {}
+        self.io_threads = io_threads
+        self._pool = None
+        self._pending = []
+        self._slots = None
+        self._lock = threading.Lock()
+        if io_threads > 0:
+            self._pool = ThreadPoolExecutor(max_workers=io_threads)
+            # Bounds the serialized bytes held in memory while waiting for the disk
+            self._slots = threading.BoundedSemaphore(io_threads * 16)
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path): return {}
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def config(self):
+        # Output format settings; anything written under a different config must be rewritten
+        return {"compact": self.compact, "precompress": list(self.precompress)}
+
+    def spawn_args(self):
+        # Picklable settings used to rebuild an equivalent writer in worker processes
+        return {"compact": self.compact, "precompress": self.precompress,
+                "io_threads": self.io_threads, "skip_unchanged": self.skip_unchanged,
+                "manifest": self.manifest}
+
+    @classmethod
+    def from_spawn_args(cls, args):
+        args = dict(args)
+        manifest = args.pop("manifest")
+        writer = cls(**args)
+        writer.manifest = manifest
+        return writer
+
+    def dumps(self, data):
+        if self.compact:
+            text = json.dumps(data, separators=(',', ':'))
+        else:
+            text = json.dumps(data, indent=2)
+        return text.encode('utf-8')
+
+    def _unchanged(self, path, digest):
+        entry = self.manifest.get(path)
+        if not entry or entry[0] != digest: return False
+        try:
+            return os.stat(path).st_mtime_ns == entry[1]
+        except OSError:
+            return False
+
+    def join_object(self, sections):
+        # JSON object built from already-serialized values, so composite files (bundle.json)
+        # reuse the bytes of their parts instead of serializing everything a second time
+        if self.compact:
+            return b'{' + b','.join(json.dumps(k).encode('utf-8') + b':' + raw for k, raw in sections.items()) + b'}'
+        body = b',\n'.join(b'  ' + json.dumps(k).encode('utf-8') + b': ' + raw for k, raw in sections.items())
+        return b'{\n' + body + b'\n}'
+
+    def write(self, path, data, kind=None):
+        return self.write_raw(path, self.dumps(data), kind)
+
+    def exists(self, path):
+        return os.path.exists(path)
+
+    def read(self, path):
+        # Bytes previously written to path, or None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def listdir(self, path):
+        try:
+            return os.listdir(path)
+        except OSError:
+            return []
+
+    def remove(self, path):
+        # Unpublishes a file written earlier, with its compressed siblings
+        for p in [path] + [f"{path}.{fmt}" for fmt in COMPRESSIONS]:
+            if os.path.exists(p): os.unlink(p)
+        self.manifest.pop(path, None)
+        self.manifest_updates[path] = None
+
+    def write_raw(self, path, raw, kind=None):
+        kind = kind or os.path.splitext(os.path.basename(path))[0]
+        stat = self.stats[kind]
+        digest = hashlib.sha1(raw + repr(self.precompress).encode('utf-8')).hexdigest()
+        if self.skip_unchanged and self._unchanged(path, digest):
+            stat["unchanged"] += 1
+            return 0
+
+        stat["files"] += 1
+        stat["bytes"] += len(raw)
+        if self._pool is None:
+            self._write_files(path, raw, digest, stat, kind)
+        else:
+            self._slots.acquire()
+            self._pending.append(self._pool.submit(self._write_task, path, raw, digest, stat, kind))
+            # Drop finished writes as the queue turns over (failed ones stay for flush() to re-raise),
+            # so a long run does not hold one future per file written
+            if len(self._pending) > self.io_threads * 64:
+                self._pending = [fut for fut in self._pending if not fut.done() or fut.exception() is not None]
+        return len(raw)
+
+    def _write_task(self, path, raw, digest, stat, kind):
+        try:
+            self._write_files(path, raw, digest, stat, kind)
+        finally:
+            self._slots.release()
+
+    def _write_files(self, path, raw, digest, stat, kind):
+        out_dir = os.path.dirname(path)
+        if out_dir and not os.path.exists(out_dir): os.makedirs(out_dir, exist_ok=True)
+        # Siblings first: once the .json is renamed into place its compressed copies are current
+        if "gz" in self.precompress:
+            packed = gzip.compress(raw, compresslevel=9, mtime=0)
+            write_atomic(path + '.gz', packed)
+            with self._lock: stat["gz_bytes"] += len(packed)
+        if "br" in self.precompress:
+            import brotli
+            packed = brotli.compress(raw)
+            write_atomic(path + '.br', packed)
+            with self._lock: stat["br_bytes"] += len(packed)
+        # Siblings of formats no longer requested would be served in place of the new .json
+        for fmt in COMPRESSIONS:
+            if fmt not in self.precompress and os.path.exists(f"{path}.{fmt}"): os.unlink(f"{path}.{fmt}")
+        write_atomic(path, raw)
+        entry = [digest, os.stat(path).st_mtime_ns]
+        self.manifest[path] = entry
+        self.manifest_updates[path] = entry
+
+    def flush(self):
+        # Wait for queued writes; re-raises the first write error
+        pending, self._pending = self._pending, []
+        for fut in pending:
+            fut.result()
+
+    def pop_results(self):
+        # Stats and manifest entries since the last pop, for a worker to send back to the parent
+        self.flush()
+        results = (dict(self.stats), self.manifest_updates)
+        self.stats = defaultdict(_empty_stat)
+        self.manifest_updates = {}
+        return results
+
+    def merge_results(self, results):
+        stats, manifest_updates = results
+        for kind, stat in stats.items():
+            mine = self.stats[kind]
+            for k, v in stat.items():
+                mine[k] += v
+        self.manifest.update(manifest_updates)
+        self.manifest_updates.update(manifest_updates)
+
+    def close(self):
+        self.flush()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self.manifest_path and self.manifest_updates:
+            # Other processes (concurrent pipeline stages) may have saved the manifest since it was
+            # loaded: merge this writer's entries into the current file under a lock
+            out_dir = os.path.dirname(self.manifest_path)
+            if out_dir: os.makedirs(out_dir, exist_ok=True)
+            with open(self.manifest_path + '.lock', 'w') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                manifest = self._load_manifest()
+                for path, entry in self.manifest_updates.items():
+                    # None: removed by this writer
+                    if entry is None: manifest.pop(path, None)
+                    else: manifest[path] = entry
+                write_atomic(self.manifest_path, json.dumps(manifest, separators=(',', ':')).encode('utf-8'))
+            self.manifest = manifest
+            self.manifest_updates = {}
+
+    def report(self):
+        if not self.stats: return
+        total = _empty_stat()
+        print("Output written (files / unchanged / bytes / gz / br):")
+        for kind in sorted(self.stats):
+            stat = self.stats[kind]
+            for k, v in stat.items(): total[k] += v
+            print(f"  {kind:<20} {stat['files']:>7} {stat['unchanged']:>9} {stat['bytes']:>12} {stat['gz_bytes']:>12} {stat['br_bytes']:>12}")
+        print(f"  {'TOTAL':<20} {total['files']:>7} {total['unchanged']:>9} {total['bytes']:>12} {total['gz_bytes']:>12} {total['br_bytes']:>12}")
+
+def add_output_args(parser):
+    parser.add_argument("--compact", action="store_true",
+                        help="write JSON without indentation or extra whitespace")
+    parser.add_argument("--precompress", default="",
+                        help="comma separated precompressed siblings to emit: gz, br")
+    parser.add_argument("--io-threads", type=int, default=4,
+                        help="background threads for file writes (0 = write inline)")
+    parser.add_argument("--force-write", action="store_true",
+                        help="rewrite every file even if its content is unchanged")
+
+def writer_from_args(args):
+    precompress = [c.strip() for c in args.precompress.split(",") if c.strip()]
+    for c in precompress:
+        if c not in COMPRESSIONS:
+            raise SystemExit(f"Unknown --precompress format '{c}' (expected: {', '.join(COMPRESSIONS)})")
+    return OutputWriter(compact=args.compact, precompress=precompress, manifest_path=DEFAULT_MANIFEST,
+                        io_threads=args.io_threads, skip_unchanged=not args.force_write)
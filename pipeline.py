@@ -0,0 +1,258 @@
+import os
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+
+from output_writer import add_output_args, writer_from_args, write_atomic
+from cohort_summary import SUMMARY_FILE
+from cohort_stats import TESTS_DIR, collect_scores, write_test_stats
+from extraction_store import EXTRACTION_FILE, EXTRACTION_LOG, iter_tests
+import evalyx_engine
+import leaderboards_v3
+
+# Stage DAG over the build. Each stage declares the files it reads and the files it writes; a
+# stage depends on the stages producing its inputs. data/build_state.json keeps, per stage, the
+# content hash of every input it last ran against plus the stage version, and only stages whose
+# inputs or version changed (or whose outputs are missing) rerun, in dependency order. Stages
+# with no pending dependency run concurrently in separate processes.
+#
+#   python pipeline.py              run what is out of date
+#   python pipeline.py --dry-run    show what would run
+#   python pipeline.py --force      rerun every stage
+#   python pipeline.py --watch      stay up and rerun what is out of date whenever a source file
+#                                   (extraction, syllabus, manual names) changes
+#
+# The profiles stage is the incremental engine run, so inside it only the students whose inputs
+# changed are rebuilt (a manual_names.json edit only relabels profiles; predictions are kept).
+# In watch mode the stages run one after another inside the watching process and share one warm
+# dict (see evalyx_engine.run_pipeline), so the parsed extraction, syllabus, per-student
+# aggregation and engine state survive between rebuilds.
+BUILD_STATE = os.path.join('data', 'build_state.json')
+STATE_VERSION = 1
+
+# Stage runners take the parsed arguments and the warm dict (None when the stage runs in a
+# fresh process)
+def _run_profiles(args, warm):
+    evalyx_engine.run_pipeline(incremental=True, workers=args.workers, writer=writer_from_args(args),
+                               warm=warm, test_stats=False, leaderboards=False)
+
+def _run_test_stats(args, warm):
+    writer = writer_from_args(args)
+    count = write_test_stats(collect_scores(iter_tests()), writer)
+    writer.close()
+    writer.report()
+    print(f"Test statistics written for {count} tests.")
+
+def _run_leaderboards(args, warm):
+    leaderboards_v3.generate(writer_from_args(args))
+
+# version: bump when a stage's logic changes so it reruns on unchanged inputs
+STAGES = [
+    {
+        "name": "profiles",
+        "inputs": [EXTRACTION_FILE, EXTRACTION_LOG, evalyx_engine.SYLLABUS_FILE, evalyx_engine.MANUAL_NAMES_FILE],
+        "outputs": [SUMMARY_FILE, evalyx_engine.STATE_FILE, evalyx_engine.INDEX_FILE, evalyx_engine.AXES_FILE],
+        "version": evalyx_engine.ENGINE_VERSION,
+        "run": _run_profiles,
+    },
+    {
+        "name": "test_stats",
+        "inputs": [EXTRACTION_FILE, EXTRACTION_LOG],
+        "outputs": [os.path.join(TESTS_DIR, 'index.json')],
+        "version": "1",
+        "run": _run_test_stats,
+    },
+    {
+        # Sole owner of the boards: the profiles stage runs the engine with leaderboards=False
+        "name": "leaderboards",
+        "inputs": [SUMMARY_FILE],
+        "outputs": [os.path.join(out_dir, f"{board_id}.json")
+                    for out_dir in (leaderboards_v3.OUTPUT_PRIVATE, leaderboards_v3.OUTPUT_PUBLIC)
+                    for board_id in leaderboards_v3.BOARD_IDS],
+        # 2: the boards are no longer also written by the profiles stage
+        "version": "2",
+        "run": _run_leaderboards,
+    },
+]
+
+def stage_graph(stages):
+    # {name: set of upstream stage names}; raises ValueError on a cycle or a file with two producers
+    producers = {}
+    for stage in stages:
+        for path in stage["outputs"]:
+            if path in producers: raise ValueError(f"{path} is produced by both {producers[path]} and {stage['name']}")
+            producers[path] = stage["name"]
+    deps = {s["name"]: {producers[p] for p in s["inputs"] if p in producers} for s in stages}
+    done, pending = set(), dict(deps)
+    while pending:
+        ready = [name for name, d in pending.items() if d <= done]
+        if not ready: raise ValueError(f"dependency cycle between stages: {', '.join(sorted(pending))}")
+        for name in ready:
+            done.add(name)
+            del pending[name]
+    return deps
+
+def load_build_state():
+    try:
+        with open(BUILD_STATE, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {"version": STATE_VERSION, "stages": {}}
+    if state.get("version") != STATE_VERSION: return {"version": STATE_VERSION, "stages": {}}
+    return state
+
+def save_build_state(state):
+    out_dir = os.path.dirname(BUILD_STATE)
+    if out_dir: os.makedirs(out_dir, exist_ok=True)
+    write_atomic(BUILD_STATE, json.dumps(state, indent=2).encode('utf-8'))
+
+def file_hash(path, known=None):
+    # [mtime_ns, size, sha1] of path (None if missing). known: the last recorded entry, whose hash
+    # is reused while mtime and size match
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if known and known[0] == st.st_mtime_ns and known[1] == st.st_size: return known
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return [st.st_mtime_ns, st.st_size, h.hexdigest()]
+
+def stale_reason(stage, prev, inputs):
+    # Why the stage must run, or None when it is up to date
+    if not prev: return "never built"
+    if prev["version"] != stage["version"]: return f"version {prev['version']} -> {stage['version']}"
+    for path, entry in inputs.items():
+        # A missing input is a state like any other (the extraction is either the .json or the
+        # .ndjson file), so it only matters when it differs from the last run
+        old = prev["inputs"].get(path)
+        if (old and old[2]) == (entry and entry[2]): continue
+        return f"{path} changed" if entry else f"missing input {path}"
+    for path in stage["outputs"]:
+        if not os.path.exists(path): return f"missing output {path}"
+    return None
+
+def log(msg):
+    # Stage processes print too; flush so the runner's lines come out in order
+    print(f"[pipeline] {msg}", flush=True)
+
+def _run_stage(fn, args, warm=None):
+    start = time.perf_counter()
+    fn(args, warm)
+    return round(time.perf_counter() - start, 3)
+
+def run(args, stages=STAGES, warm=None):
+    # warm: run the stages in this process, one at a time, sharing the dict between them (watch
+    # mode); otherwise each stage gets a fresh process
+    deps = stage_graph(stages)
+    by_name = {s["name"]: s for s in stages}
+    state = load_build_state()
+    pending = [s["name"] for s in stages]
+    done, failed, running = set(), [], {}
+    would_run = set()  # --dry-run: stages that would run, so their downstream stages would too
+
+    pool = ThreadPoolExecutor(max_workers=1) if warm is not None else ProcessPoolExecutor(max_workers=max(1, args.jobs))
+    with pool:
+        while pending or running:
+            # Schedule everything whose upstream stages have finished
+            for name in [n for n in pending if deps[n] <= done]:
+                pending.remove(name)
+                stage = by_name[name]
+                prev = state["stages"].get(name)
+                known = prev["inputs"] if prev else {}
+                inputs = {path: file_hash(path, known.get(path)) for path in stage["inputs"]}
+                reason = "forced" if args.force else stale_reason(stage, prev, inputs)
+                if reason is None and deps[name] & would_run: reason = f"after {', '.join(sorted(deps[name] & would_run))}"
+                if reason is None:
+                    log(f"{name}: up to date")
+                    done.add(name)
+                elif args.dry_run:
+                    log(f"{name}: would run ({reason})")
+                    would_run.add(name)
+                    done.add(name)
+                else:
+                    log(f"{name}: running ({reason})")
+                    running[pool.submit(_run_stage, stage["run"], args, warm)] = (name, inputs)
+            if not running:
+                if pending and not any(deps[n] <= done for n in pending): break  # upstream failed
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                name, inputs = running.pop(fut)
+                try:
+                    wall = fut.result()
+                except Exception as e:
+                    log(f"{name}: FAILED ({e!r})")
+                    failed.append(name)
+                    continue
+                # Inputs are hashed as they were when the stage started: a change during the run
+                # makes it stale again next time
+                state["stages"][name] = {"version": by_name[name]["version"], "inputs": inputs,
+                                         "finished_at": datetime.now().isoformat(), "wall_s": wall}
+                save_build_state(state)
+                done.add(name)
+                log(f"{name}: done in {wall:.2f}s")
+
+    if failed or pending:
+        skipped = f"; not run: {', '.join(pending)}" if pending else ""
+        raise SystemExit(f"[pipeline] failed: {', '.join(failed)}{skipped}")
+
+def source_files(stages):
+    # Stage inputs no stage produces: the files people edit
+    produced = {path for s in stages for path in s["outputs"]}
+    return sorted({path for s in stages for path in s["inputs"]} - produced)
+
+def watch(args, stages=STAGES):
+    # Poll the source files; once one changes, wait until none has changed for --debounce
+    # seconds (an editor save or an ingest can touch several in a burst), then rebuild
+    warm = {}
+    paths = source_files(stages)
+    keys = lambda: {path: evalyx_engine.file_key(path) for path in paths}
+    seen = keys()
+    rebuild = True  # catch up on anything edited while nobody was watching
+    log(f"watching {', '.join(paths)} (Ctrl+C to stop)")
+    try:
+        while True:
+            if rebuild:
+                start = time.perf_counter()
+                try:
+                    run(args, stages, warm)
+                except SystemExit as e:
+                    print(f"{e} - waiting for the next change", flush=True)
+                log(f"rebuild finished in {time.perf_counter() - start:.2f}s")
+            time.sleep(args.poll)
+            current = keys()
+            rebuild = current != seen
+            if not rebuild: continue
+            while True:
+                time.sleep(args.debounce)
+                settled = keys()
+                if settled == current: break
+                current = settled
+            log(f"changed: {', '.join(path for path in paths if current[path] != seen[path])}")
+            seen = current
+    except KeyboardInterrupt:
+        log("stopped watching")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the out-of-date pipeline stages in dependency order")
+    parser.add_argument("--force", action="store_true", help="rerun every stage")
+    parser.add_argument("--dry-run", action="store_true", help="only print which stages would run")
+    parser.add_argument("--jobs", type=int, default=len(STAGES), help="stages to run at the same time")
+    parser.add_argument("--workers", type=int, default=1, help="evalyx_engine worker processes")
+    parser.add_argument("--watch", action="store_true", help="keep running and rebuild when a source file changes")
+    parser.add_argument("--poll", type=float, default=1.0, help="--watch: seconds between checks")
+    parser.add_argument("--debounce", type=float, default=0.5,
+                        help="--watch: rebuild once the files have been quiet for this long")
+    add_output_args(parser)
+    args = parser.parse_args()
+    if args.watch:
+        watch(args)
+    else:
+        run(args)
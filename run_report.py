@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import resource
+from datetime import datetime
+from contextlib import contextmanager
+from collections import defaultdict
+
+# Stage-level instrumentation for pipeline runs. Each stage records wall time, CPU time
+# (own + reaped child processes, so pool workers count), the process peak RSS when the stage
+# ended, an item count and the bytes handed to the OutputWriter. Per-student work is broken
+# down further by SectionTimer and reported under "sections".
+
+def _cpu():
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+def _peak_rss_mb():
+    # ru_maxrss is in KiB on Linux; children = largest reaped worker
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(own / 1024, 1), round(children / 1024, 1)
+
+def _written_bytes(writer):
+    if writer is None: return 0
+    return sum(stat["bytes"] + stat["gz_bytes"] + stat["br_bytes"] for stat in writer.stats.values())
+
+class SectionTimer:
+    # Accumulates wall/CPU time per named section across many calls (e.g. one build_student per
+    # PSID). start() marks the beginning, lap(name) charges the time since the last mark to name.
+    def __init__(self):
+        self.totals = defaultdict(lambda: [0.0, 0.0, 0])
+        self._wall = self._cpu = 0.0
+
+    def start(self):
+        self._wall, self._cpu = time.perf_counter(), time.process_time()
+
+    def lap(self, name):
+        wall, cpu = time.perf_counter(), time.process_time()
+        total = self.totals[name]
+        total[0] += wall - self._wall
+        total[1] += cpu - self._cpu
+        total[2] += 1
+        self._wall, self._cpu = wall, cpu
+
+    def pop(self):
+        # Plain dict of the totals so far (picklable, for pool workers), then reset
+        totals = {name: list(v) for name, v in self.totals.items()}
+        self.totals.clear()
+        return totals
+
+    def merge(self, totals):
+        for name, (wall, cpu, count) in totals.items():
+            mine = self.totals[name]
+            mine[0] += wall
+            mine[1] += cpu
+            mine[2] += count
+
+class RunReport:
+    def __init__(self, name, options=None):
+        self.data = {
+            "run": name,
+            "started_at": datetime.now().isoformat(),
+            "options": options or {},
+            "stages": [],
+            "sections": {},
+        }
+        self._wall = time.perf_counter()
+        self._cpu = _cpu()
+
+    @contextmanager
+    def stage(self, name, writer=None):
+        # Yields a dict; set "items" on it to record how many things the stage processed
+        info = {"items": None}
+        wall, cpu, written = time.perf_counter(), _cpu(), _written_bytes(writer)
+        try:
+            yield info
+        finally:
+            peak, child_peak = _peak_rss_mb()
+            self.data["stages"].append({
+                "stage": name,
+                "wall_s": round(time.perf_counter() - wall, 4),
+                "cpu_s": round(_cpu() - cpu, 4),
+                "peak_rss_mb": peak,
+                "child_peak_rss_mb": child_peak,
+                "items": info["items"],
+                "bytes_written": _written_bytes(writer) - written,
+            })
+
+    def add_sections(self, timer):
+        for name, (wall, cpu, count) in timer.totals.items():
+            self.data["sections"][name] = {"wall_s": round(wall, 4), "cpu_s": round(cpu, 4), "calls": count}
+
+    def finish(self, path, writer=None):
+        peak, child_peak = _peak_rss_mb()
+        self.data["finished_at"] = datetime.now().isoformat()
+        self.data["total"] = {
+            "wall_s": round(time.perf_counter() - self._wall, 4),
+            "cpu_s": round(_cpu() - self._cpu, 4),
+            "peak_rss_mb": peak,
+            "child_peak_rss_mb": child_peak,
+        }
+        if writer is not None: self.data["output"] = {kind: dict(stat) for kind, stat in sorted(writer.stats.items())}
+        out_dir = os.path.dirname(path)
+        if out_dir: os.makedirs(out_dir, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2)
+
+    def print_summary(self):
+        print(f"{'stage':<22} {'wall s':>9} {'cpu s':>9} {'rss MB':>8} {'items':>8}")
+        for s in self.data["stages"]:
+            items = "" if s["items"] is None else s["items"]
+            print(f"{s['stage']:<22} {s['wall_s']:>9.3f} {s['cpu_s']:>9.3f} {s['peak_rss_mb']:>8.1f} {items:>8}")
@@ -0,0 +1,267 @@
+import math
+import importlib.util
+from array import array
+from collections import Counter
+
+# NumPy is optional: without it the engine falls back to the per-student compute_metrics path
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+if HAS_NUMPY:
+    import numpy as np
+
+SUBJECTS = ["physics", "chemistry", "botany", "zoology"]
+CHANNELS = SUBJECTS + ["total"]
+TOTAL = CHANNELS.index("total")
+
+TREND_NAMES = ["stable", "improving", "declining"]
+STATUS_NAMES = ["neutral", "boosting", "limiting"]
+
+# Same constants as evalyx_engine (DROP_NONE, DROP_SIGNIFICANT, DROP_RECENT)
+DROP_NONE, DROP_SIGNIFICANT, DROP_RECENT = 0, 1, 2
+
+def _is_number(v):
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+def build_score_tensor(student_rows, sort_keys, psids):
+    # Dense students x tests x channels array (channels = 4 subjects + total) plus presence masks.
+    # student_rows[r]: (block, marks) for each extraction row of psids[r], in file order;
+    # sort_keys[b]: the (syl_date, order_idx) key the engine sorts a student's tests by, for
+    # extraction block b. Columns follow that key (stable on file order), so a student's taken
+    # columns are exactly their sorted_tests in order.
+    order = sorted(range(len(sort_keys)), key=lambda i: sort_keys[i])
+    col_of = {block: col for col, block in enumerate(order)}
+    S, T, C = len(psids), len(order), len(CHANNELS)
+
+    taken = np.zeros((S, T), dtype=bool)
+    # Students the tensor cannot represent exactly (same PSID twice in one test, missing total,
+    # non-numeric marks) are left to the scalar path.
+    irregular = np.zeros(S, dtype=bool)
+    # Typed arrays rather than lists: one entry per mark, so these are the largest temporaries
+    rows, cols, chans, vals = array('q'), array('q'), array('q'), array('d')
+    for r, student in enumerate(student_rows):
+        seen = set()
+        for block, marks in student:
+            col = col_of[block]
+            if col in seen:
+                irregular[r] = True
+                continue
+            seen.add(col)
+            if not _is_number(marks.get("total")): irregular[r] = True
+            for c, ch in enumerate(CHANNELS):
+                if ch not in marks: continue
+                v = marks[ch]
+                if not _is_number(v):
+                    irregular[r] = True
+                    continue
+                rows.append(r); cols.append(col); chans.append(c); vals.append(v)
+            taken[r, col] = True
+
+    values = np.zeros((S, T, C), dtype=np.float64)
+    values[np.frombuffer(rows, dtype=np.int64), np.frombuffer(cols, dtype=np.int64),
+           np.frombuffer(chans, dtype=np.int64)] = np.frombuffer(vals, dtype=np.float64)
+
+    return {
+        "psids": psids,
+        "columns": order,
+        "values": values,
+        "taken": taken,
+        "irregular": irregular,
+    }
+
+def tensor_rows(tensor, start, stop):
+    # Students start:stop of a score tensor (views, no copy). Every metric is computed per row,
+    # so a block gives the same numbers as the whole tensor.
+    return {
+        "psids": tensor["psids"][start:stop],
+        "columns": tensor["columns"],
+        "values": tensor["values"][start:stop],
+        "taken": tensor["taken"][start:stop],
+        "irregular": tensor["irregular"][start:stop],
+    }
+
+def _seq_sum(x, m):
+    # Left-to-right sum over the tests axis, matching Python's sum() over a sorted test list
+    acc = np.zeros(x.shape[0], dtype=np.float64)
+    for j in range(x.shape[1]):
+        acc = acc + np.where(m[:, j], x[:, j], 0.0)
+    return acc
+
+def _pick(x, cols):
+    return x[np.arange(x.shape[0]), cols]
+
+def cohort_metrics(tensor, happened_cols):
+    # Returns {psid: metrics} in the shape of evalyx_engine.compute_metrics for every regular
+    # student. happened_cols[j] is True when column j is at or before the FT08 cut-off.
+    values, taken = tensor["values"], tensor["taken"]
+    S, T = taken.shape
+    if S == 0 or T == 0: return {}
+    happened_cols = np.asarray(happened_cols, dtype=bool)
+    tot = values[:, :, TOTAL]
+
+    n = taken.sum(axis=1)
+    pos = np.cumsum(taken, axis=1) - 1           # position within the student's sorted tests
+    safe_n = np.maximum(n, 1)
+
+    # Latest: last happened test, else last test
+    hp = taken & happened_cols
+    last_hp = T - 1 - np.argmax(hp[:, ::-1], axis=1)
+    last_taken = T - 1 - np.argmax(taken[:, ::-1], axis=1)
+    latest_col = np.where(hp.any(axis=1), last_hp, last_taken)
+    latest_pos = _pick(pos, latest_col)
+    latest_tot = _pick(tot, latest_col)
+
+    # Totals-based profile metrics (every regular student has a total for each test)
+    total_sum = _seq_sum(tot, taken)
+    avg = total_sum / safe_n
+    best_col = np.argmax(np.where(taken, tot, -np.inf), axis=1)
+    best_pos = _pick(pos, best_col)
+
+    sq = _seq_sum((tot - avg[:, None]) ** 2, taken)
+    cv_all = np.sqrt(sq / safe_n) / np.where(avg == 0, 1.0, avg)
+    log15 = math.log2(15)
+    reliability = np.array([min(1.0, math.log2(k + 1) / log15) for k in range(T + 1)])
+    consistency = np.where(n < 2, avg * 0.4, avg * (1 / (cv_all + 1)) * reliability[n])
+    consistency = np.where(avg == 0, 0.0, consistency)
+
+    # Trend: last two tests (prev_tot is 0 for single-test students and never used for them)
+    curr = _pick(tot, last_taken)
+    prev_tot = _seq_sum(tot, taken & (pos == (n - 2)[:, None]))
+    diff = curr - prev_tot
+    trend = np.zeros(S, dtype=np.int8)
+    trend[(n >= 2) & (diff > 10)] = 1
+    trend[(n >= 2) & (diff < -10)] = 2
+
+    # Module 1: last 3 tests vs latest
+    k3 = np.minimum(n, 3)
+    recent = taken & (pos >= (n - 3)[:, None])
+    delta_total = latest_tot - _seq_sum(tot, recent) / np.maximum(k3, 1)
+    delta_subj = np.stack([
+        _pick(values[:, :, c], latest_col) - _seq_sum(values[:, :, c], recent) / np.maximum(k3, 1)
+        for c in range(len(SUBJECTS))
+    ], axis=1)
+
+    # Module 2: last 2 tests
+    c_count = np.minimum(n, 2)
+    c_mean = np.where(c_count == 2, (prev_tot + curr) / 2, np.where(c_count == 1, curr, 0.0))
+    c_ok = (c_count > 1) & (c_mean > 0)
+    c_var = ((prev_tot - c_mean) ** 2 + (curr - c_mean) ** 2) / 2
+    c_cv = np.sqrt(c_var) / np.where(c_ok, c_mean, 1.0)
+    drop = prev_tot - curr
+    c_drop = np.zeros(S, dtype=np.int8)
+    pct_drop = (prev_tot > 0) & (drop / np.where(prev_tot > 0, prev_tot, 1.0) > 0.02)
+    c_drop[c_ok & pct_drop] = DROP_RECENT
+    c_drop[c_ok & (drop > 15)] = DROP_SIGNIFICANT
+
+    # Module 4: recency-weighted estimate over the last 5 tests, subject boosting/limiting
+    p_count = np.minimum(n, 5)
+    weights = np.where(taken & (pos >= (n - 5)[:, None]), pos - (n - p_count)[:, None] + 1, 0)
+    weighted_sum = _seq_sum(tot * weights, weights > 0)
+    p_est = weighted_sum / np.maximum(p_count * (p_count + 1) // 2, 1)
+    benchmark = avg / 4.0
+    sub_avg = np.stack([_seq_sum(values[:, :, c], taken) / safe_n for c in range(len(SUBJECTS))], axis=1)
+    status = np.zeros(sub_avg.shape, dtype=np.int8)
+    status[sub_avg < (benchmark * 0.95)[:, None]] = 2
+    status[sub_avg > (benchmark * 1.05)[:, None]] = 1
+
+    # Back to per-student dicts; rounding stays in Python so it matches round() exactly
+    cols = {
+        "latest_pos": latest_pos.tolist(), "best_pos": best_pos.tolist(), "avg": avg.tolist(),
+        "consistency": consistency.tolist(), "trend": trend.tolist(), "n": n.tolist(),
+        "delta_total": delta_total.tolist(), "delta_subj": delta_subj.tolist(),
+        "c_count": c_count.tolist(), "c_ok": c_ok.tolist(), "c_var": c_var.tolist(),
+        "c_cv": c_cv.tolist(), "c_drop": c_drop.tolist(),
+        "p_count": p_count.tolist(), "p_est": p_est.tolist(), "status": status.tolist(),
+    }
+    irregular = tensor["irregular"].tolist()
+    result = {}
+    for r, psid in enumerate(tensor["psids"]):
+        if irregular[r] or cols["n"][r] == 0: continue
+        m = {
+            "latest_pos": cols["latest_pos"][r],
+            "avg_score": cols["avg"][r],
+            "best_pos": cols["best_pos"][r],
+            "consistency": round(cols["consistency"][r], 2),
+            "trend": TREND_NAMES[cols["trend"][r]],
+            "c_count": cols["c_count"][r],
+            "c_variance": cols["c_var"][r] if cols["c_ok"][r] else 0,
+            "c_cv": cols["c_cv"][r] if cols["c_ok"][r] else None,
+            "c_drop": cols["c_drop"][r],
+            "p_count": cols["p_count"][r],
+            "p_score_est": cols["p_est"][r],
+            "p_subj_status": {sub: STATUS_NAMES[code] for sub, code in zip(SUBJECTS, cols["status"][r])},
+        }
+        if cols["n"][r] >= 2:
+            m["delta_total_recent"] = round(cols["delta_total"][r])
+            m["subjects_delta"] = {sub: round(d) for sub, d in zip(SUBJECTS, cols["delta_subj"][r])}
+        result[psid] = m
+    return result
+
+CHAPTER_MAX = 180  # per-subject maximum, as in evalyx_engine.build_student
+
+def compile_chapter_weights(syllabus_map, column_tids):
+    # The syllabus as a sparse tests x chapters matrix per subject, in column order of the score
+    # tensor: {sub: (chapters, entries)} where chapters[k] names chapter k and entries[j] is
+    # (passes, divisor, first_pos) for test column j. A test spreads each subject's marks evenly
+    # over its chapter list, so every nonzero in column j has weight 1/divisor; passes are arrays
+    # of chapter indices without repeats (a chapter listed twice in one test gets a second pass,
+    # as the scalar loop counts it twice) and first_pos is each chapter's first list position.
+    # Compiled once per run and shared by every student.
+    weights = {}
+    for sub in SUBJECTS:
+        index, entries = {}, []
+        for tid in column_tids:
+            if tid not in syllabus_map:
+                entries.append(None)
+                continue
+            chapters = syllabus_map[tid].get(sub, {}).get('chapters', [])
+            if not chapters:
+                entries.append(None)
+                continue
+            passes, first_pos, seen = [], {}, Counter()
+            for pos, ch in enumerate(chapters):
+                k = index.setdefault(ch, len(index))
+                first_pos.setdefault(k, pos)
+                if seen[k] == len(passes): passes.append([])
+                passes[seen[k]].append(k)
+                seen[k] += 1
+            entries.append(([np.array(p, dtype=np.intp) for p in passes], len(chapters), first_pos))
+        weights[sub] = (list(index), entries)
+    return weights
+
+def cohort_chapter_stats(tensor, weights):
+    # Returns one {sub: [(chapter, percentage), ...]} per tensor row, the chapter list each
+    # student's build_student would accumulate: chapter totals and maxima are the score tensor
+    # times the sparse weight matrix, applied one test column at a time so every sum is added in
+    # the student's own test order (bit-identical to the scalar loop). Chapters are ordered by
+    # first appearance in the student's tests.
+    values, taken = tensor["values"], tensor["taken"]
+    S, T = taken.shape
+    result = [{} for _ in range(S)]
+    for c, sub in enumerate(SUBJECTS):
+        chapters, entries = weights[sub]
+        K = len(chapters)
+        total = np.zeros((S, K), dtype=np.float64)
+        cap = np.zeros((S, K), dtype=np.float64)
+        first = np.full((S, K), np.iinfo(np.int64).max, dtype=np.int64)
+        width = max([e[1] for e in entries if e] + [1])
+        for j, entry in enumerate(entries):
+            if entry is None: continue
+            passes, divisor, first_pos = entry
+            share = (values[:, j, c] / divisor)[:, None]   # untaken tests hold 0 marks
+            col_cap = np.where(taken[:, j], CHAPTER_MAX / divisor, 0.0)[:, None]
+            for ks in passes:
+                total[:, ks] += share
+                cap[:, ks] += col_cap
+            ks = passes[0]
+            key = j * width + np.array([first_pos[k] for k in ks], dtype=np.int64)
+            first[:, ks] = np.where(taken[:, j][:, None], np.minimum(first[:, ks], key), first[:, ks])
+
+        present = cap > 0
+        perc = np.where(present, total / np.where(present, cap, 1.0) * 100, 0.0)
+        order = np.argsort(first, axis=1, kind='stable')
+        counts = present.sum(axis=1).tolist()
+        perc_rows = perc.tolist()
+        order_rows = order.tolist()
+        for r in range(S):
+            row = perc_rows[r]
+            result[r][sub] = [(chapters[k], row[k]) for k in order_rows[r][:counts[r]]]
+    return result
@@ -9,7 +9,9 @@ export default function AdminUploadPage() {
         test_id: '',
         test_type: 'FT',
         test_date: '',
-        max_marks: 720
+        max_marks: 720,
+        parser_mode: 'table',
+        validate_parser: false
     });
     const [status, setStatus] = useState('idle'); // idle, uploading, processing, success, error
     const [logs, setLogs] = useState([]);
@@ -20,6 +22,26 @@ export default function AdminUploadPage() {
         }
     };
 
+    const pollJob = async (jobId) => {
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            const res = await fetch(`/api/admin/ingest?job=${jobId}`);
+            const job = await res.json();
+            if (!res.ok) throw new Error(job.error || 'Job status unavailable');
+
+            const { pages_done, pages } = job.progress || {};
+            const progressLine = pages ? [`[${job.state}] page ${pages_done}/${pages}`] : [`[${job.state}]`];
+            setLogs([...(job.logs || []), ...progressLine]);
+
+            if (job.state === 'done') {
+                setStatus('success');
+                setLogs(job.logs || []);
+                return;
+            }
+            if (job.state === 'failed') throw new Error(job.error || 'Ingest job failed');
+        }
+    };
+
     const handleSubmit = async (e) => {
         e.preventDefault();
         if (!file || !metadata.test_id || !metadata.test_date) return;
@@ -33,6 +55,8 @@ export default function AdminUploadPage() {
         formData.append('test_type', metadata.test_type);
         formData.append('test_date', metadata.test_date);
         formData.append('max_marks', metadata.max_marks);
+        formData.append('parser_mode', metadata.parser_mode);
+        formData.append('validate_parser', metadata.validate_parser ? 'true' : 'false');
 
         try {
             const res = await fetch('/api/admin/ingest', {
@@ -46,6 +70,14 @@ export default function AdminUploadPage() {
                 throw new Error(data.error || 'Upload failed');
             }
 
+            if (data.job_id) {
+                // Queued on the resident ingest worker: follow the job until it finishes
+                setStatus('processing');
+                setLogs(data.logs || []);
+                await pollJob(data.job_id);
+                return;
+            }
+
             setStatus('success');
             setLogs(data.logs || []);
         } catch (err) {
@@ -107,6 +139,26 @@ export default function AdminUploadPage() {
                                 />
                             </div>
 
+                            <div>
+                                <label className="block text-xs font-bold text-slate-500 uppercase mb-1">PDF Parser</label>
+                                <select
+                                    className="w-full p-2 border border-slate-300 rounded-lg text-sm"
+                                    value={metadata.parser_mode}
+                                    onChange={(e) => setMetadata({ ...metadata, parser_mode: e.target.value })}
+                                >
+                                    <option value="table">Table detection (default)</option>
+                                    <option value="text">Text layer (standard layouts, skips absentees)</option>
+                                </select>
+                                <label className="flex items-center gap-2 mt-2 text-xs text-slate-500">
+                                    <input
+                                        type="checkbox"
+                                        checked={metadata.validate_parser}
+                                        onChange={(e) => setMetadata({ ...metadata, validate_parser: e.target.checked })}
+                                    />
+                                    Cross-check with the other parser and log differences
+                                </label>
+                            </div>
+
                             <div className="pt-4 border-t border-slate-100">
                                 <label className="block text-xs font-bold text-slate-500 uppercase mb-2">Result PDF</label>
                                 <div className="border-2 border-dashed border-slate-300 rounded-xl p-6 text-center hover:bg-slate-50 transition-colors">
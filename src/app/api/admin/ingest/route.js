@@ -1,11 +1,41 @@
 import { NextResponse } from 'next/server';
-import { writeFile, mkdir } from 'fs/promises';
+import { writeFile, mkdir, readFile, rename, stat } from 'fs/promises';
 import path from 'path';
 import { exec } from 'child_process';
 import util from 'util';
 
 const execPromise = util.promisify(exec);
 
+// Spool directory shared with the resident worker (python ingest_worker.py)
+const JOBS_DIR = path.join(process.cwd(), 'temp_uploads', 'jobs');
+// A worker heartbeat older than this means no worker is running; uploads then run inline
+const WORKER_STALE_MS = 15000;
+
+async function workerAlive() {
+    try {
+        const info = await stat(path.join(JOBS_DIR, 'worker.json'));
+        return Date.now() - info.mtimeMs < WORKER_STALE_MS;
+    } catch (err) {
+        return false;
+    }
+}
+
+async function queueJob(job) {
+    const queueDir = path.join(JOBS_DIR, 'queue');
+    const statusDir = path.join(JOBS_DIR, 'status');
+    await mkdir(queueDir, { recursive: true });
+    await mkdir(statusDir, { recursive: true });
+
+    await writeFile(path.join(statusDir, `${job.job_id}.json`), JSON.stringify({
+        job_id: job.job_id, test_id: job.test_id, state: 'queued', submitted_at: job.submitted_at,
+        progress: { pages_done: 0, pages: null }, logs: []
+    }));
+    // Written under a temporary name and renamed, so the worker never reads a partial job
+    const tmpPath = path.join(queueDir, `.${job.job_id}.tmp`);
+    await writeFile(tmpPath, JSON.stringify(job));
+    await rename(tmpPath, path.join(queueDir, `${job.job_id}.json`));
+}
+
 export async function POST(req) {
     try {
         const formData = await req.formData();
@@ -14,6 +44,9 @@ export async function POST(req) {
         const testType = formData.get('test_type');
         const testDate = formData.get('test_date');
         const maxMarks = formData.get('max_marks');
+        // Only known parser modes reach the command line
+        const parserMode = formData.get('parser_mode') === 'text' ? 'text' : 'table';
+        const validate = formData.get('validate_parser') === 'true';
 
         if (!file || !testId) {
             return NextResponse.json({ error: 'Missing file or test_id' }, { status: 400 });
@@ -30,9 +63,26 @@ export async function POST(req) {
 
         await writeFile(filePath, buffer);
 
-        // Run Python Script
-        // python admin_ingest.py <pdf_path> <test_id> <test_type> <test_date> <max_marks>
-        const command = `python admin_ingest.py "${filePath}" "${testId}" "${testType}" "${testDate}" "${maxMarks}"`;
+        // Hand the job to the resident worker and return right away; the page polls GET ?job=<id>
+        if (await workerAlive()) {
+            const jobId = `${Date.now()}_${Math.random().toString(36).slice(2, 8)}`;
+            await queueJob({
+                job_id: jobId,
+                pdf_path: filePath,
+                test_id: testId,
+                test_type: testType,
+                test_date: testDate,
+                max_marks: maxMarks,
+                parser: parserMode,
+                validate,
+                submitted_at: new Date().toISOString()
+            });
+            return NextResponse.json({ success: true, job_id: jobId, logs: [`Queued ingest job ${jobId}`] });
+        }
+
+        // No worker running: run the pipeline inline
+        // python admin_ingest.py <pdf_path> <test_id> <test_type> <test_date> <max_marks> --parser <mode> [--validate]
+        const command = `python admin_ingest.py "${filePath}" "${testId}" "${testType}" "${testDate}" "${maxMarks}" --parser ${parserMode}${validate ? ' --validate' : ''}`;
 
         console.log(`Executing: ${command}`);
 
@@ -57,3 +107,17 @@ export async function POST(req) {
         return NextResponse.json({ error: error.message }, { status: 500 });
     }
 }
+
+// Job status written by ingest_worker.py
+export async function GET(req) {
+    const jobId = new URL(req.url).searchParams.get('job');
+    if (!jobId || !/^[\w-]+$/.test(jobId)) {
+        return NextResponse.json({ error: 'Missing or invalid job id' }, { status: 400 });
+    }
+    try {
+        const raw = await readFile(path.join(JOBS_DIR, 'status', `${jobId}.json`), 'utf-8');
+        return NextResponse.json(JSON.parse(raw));
+    } catch (err) {
+        return NextResponse.json({ error: 'Unknown job' }, { status: 404 });
+    }
+}
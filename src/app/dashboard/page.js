@@ -5,6 +5,7 @@ import { useRouter } from 'next/navigation';
 import Navbar from '@/components/Navbar';
 import GraphSection from '@/components/GraphSection';
 import AnalyticsCards from '@/components/AnalyticsCards';
+import TestStandingCard from '@/components/TestStandingCard';
 import { TrendingUp, TrendingDown, Minus, Target, Award, Calendar, ChevronRight } from 'lucide-react';
 import { motion } from 'framer-motion';
 
@@ -98,6 +99,11 @@ export default function Dashboard() {
                     <AnalyticsCards psid={user.psid} />
                 </motion.div>
 
+                {/* Cohort standing in the latest test (tests are not stored in date order) */}
+                <motion.div variants={itemVariants}>
+                    <TestStandingCard psid={user.psid} test={user.tests?.find(t => t.test_id === meta.latest_test_id)} />
+                </motion.div>
+
                 {/* Graph Section */}
                 <motion.div variants={itemVariants} className="mb-8 p-6 bg-white rounded-xl border border-slate-200 shadow-sm mt-8">
                     <GraphSection psid={user.psid} />
@@ -2,6 +2,7 @@
 import { useEffect, useState } from 'react';
 import Navbar from '@/components/Navbar';
 import { useAuth } from '@/context/AuthContext';
+import { loadBoard, findBoardEntry } from '@/lib/leaderboards';
 import { Trophy, Medal, Star, Info, Loader2, ArrowUpCircle, ArrowDownCircle, MinusCircle, User } from 'lucide-react';
 import { motion, AnimatePresence } from 'framer-motion';
 
@@ -16,6 +17,12 @@ export default function LeaderboardPage() {
     const [leaderboard, setLeaderboard] = useState(null);
     const [loading, setLoading] = useState(true);
     const [activeBoard, setActiveBoard] = useState('latest_scores');
+    const [myEntry, setMyEntry] = useState(null);
+    const [sortOrder, setSortOrder] = useState('none'); // none, asc, desc
+    const [selectedBatch, setSelectedBatch] = useState('All');
+
+    // The top page is enough for the overall view; batch filtering needs the whole board
+    const needFullBoard = selectedBatch !== 'All';
 
     const boards = [
         { id: 'latest_scores', name: 'Latest Scores', icon: Medal },
@@ -27,28 +34,32 @@ export default function LeaderboardPage() {
         const fetchBoard = async () => {
             setLoading(true);
             try {
-                const res = await fetch(`/api/leaderboards/public/${activeBoard}.json`);
-                const data = await res.json();
-                setLeaderboard(data);
+                setLeaderboard(await loadBoard(activeBoard, { full: needFullBoard }));
             } catch (err) {
                 console.error("Failed to fetch leaderboard", err);
             }
             setLoading(false);
         };
         fetchBoard();
-    }, [activeBoard]);
+    }, [activeBoard, needFullBoard]);
 
-    const [sortOrder, setSortOrder] = useState('none'); // none, asc, desc
-    const [selectedBatch, setSelectedBatch] = useState('All');
+    useEffect(() => {
+        setMyEntry(null);
+        findBoardEntry(activeBoard, currentUser?.psid)
+            .then(entry => setMyEntry(entry))
+            .catch(err => console.error("Failed to look up rank", err));
+    }, [activeBoard, currentUser?.psid]);
 
     // Get unique batches from data
-    const uniqueBatches = ['All', ...new Set(leaderboard?.entries?.map(e => e.batch).filter(Boolean) || [])].sort();
+    const uniqueBatches = ['All', ...new Set(leaderboard?.batches || leaderboard?.entries?.map(e => e.batch).filter(Boolean) || [])].sort();
 
-    // Data for "My Status" bar
-    const userGlobalEntry = leaderboard?.entries?.find(e => e.psid === currentUser?.psid);
+    // Data for "My Status" bar. Public boards mask PSIDs, so the user's row is matched by the rank
+    // the index lookup returned
+    const userGlobalEntry = myEntry;
+    const isUserEntry = (e) => !!userGlobalEntry && e.rank === userGlobalEntry.rank;
     const batchEntries = leaderboard?.entries?.filter(e => e.batch === selectedBatch) || [];
     const userBatchRank = selectedBatch !== 'All'
-        ? (batchEntries.findIndex(e => e.psid === currentUser?.psid) + 1)
+        ? (batchEntries.findIndex(isUserEntry) + 1)
         : null;
 
     const getDisplayEntries = () => {
@@ -220,10 +231,10 @@ export default function LeaderboardPage() {
                                 <AnimatePresence mode="wait">
                                     {getDisplayEntries().map((entry, idx) => {
                                         const displayRank = selectedBatch === 'All' ? entry.rank : idx + 1;
-                                        const isCurrentUser = currentUser?.psid === entry.psid;
+                                        const isCurrentUser = isUserEntry(entry);
                                         return (
                                             <motion.tr
-                                                key={`${entry.psid}-${selectedBatch}`} // changing key forces re-render on batch change
+                                                key={`${entry.rank}-${selectedBatch}`} // changing key forces re-render on batch change
                                                 initial={{ opacity: 0, x: -10 }}
                                                 animate={{ opacity: 1, x: 0 }}
                                                 transition={{ duration: 0.2, delay: idx * 0.03 }} // Staggered rows
@@ -1,5 +1,6 @@
 "use client";
 import { useEffect, useState } from 'react';
+import { fetchStudentSection } from '@/lib/studentData';
 import { TrendingUp, TrendingDown, Activity, CheckCircle, AlertTriangle, HelpCircle, ArrowUp, ArrowDown, Minus } from 'lucide-react';
 
 export default function AnalyticsCards({ psid }) {
@@ -13,15 +14,15 @@ export default function AnalyticsCards({ psid }) {
 
         const fetchData = async () => {
             try {
-                const [dRes, cRes, rRes] = await Promise.all([
-                    fetch(`/api/students/${psid}/graphs/progress_delta.json`),
-                    fetch(`/api/students/${psid}/analysis/consistency.json`),
-                    fetch(`/api/students/${psid}/analysis/readiness.json`)
+                const [d, c, r] = await Promise.all([
+                    fetchStudentSection(psid, 'progress_delta'),
+                    fetchStudentSection(psid, 'consistency'),
+                    fetchStudentSection(psid, 'readiness')
                 ]);
 
-                if (dRes.ok) setDelta(await dRes.json());
-                if (cRes.ok) setConsistency(await cRes.json());
-                if (rRes.ok) setReadiness(await rRes.json());
+                if (d) setDelta(d);
+                if (c) setConsistency(c);
+                if (r) setReadiness(r);
             } catch (err) {
                 console.error("Failed to load analytics", err);
             } finally {
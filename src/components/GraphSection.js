@@ -11,6 +11,7 @@ import {
     Tooltip,
     Legend,
 } from 'chart.js';
+import { fetchStudentSection, fetchGraphAxes, expandSubjectTrends } from '@/lib/studentData';
 
 ChartJS.register(
     CategoryScale,
@@ -30,13 +31,11 @@ export default function GraphSection({ psid }) {
     useEffect(() => {
         if (!psid) return;
 
-        fetch(`/api/students/${psid}/graphs/subject_trends.json`)
-            .then(res => {
-                if (!res.ok) throw new Error("Failed to load graphs");
-                return res.json();
-            })
-            .then(data => {
-                const validGraphs = data.graphs.filter(g => g.datasets && g.datasets.length > 0 && g.x_axis.values.length > 0);
+        fetchStudentSection(psid, 'subject_trends')
+            .then(async data => {
+                if (!data) throw new Error("Failed to load graphs");
+                const expanded = data.axes ? expandSubjectTrends(data, await fetchGraphAxes(data)) : data.graphs;
+                const validGraphs = expanded.filter(g => g.datasets && g.datasets.length > 0 && g.x_axis.values.length > 0);
                 setGraphs(validGraphs);
                 setLoading(false);
             })
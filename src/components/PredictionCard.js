@@ -2,6 +2,7 @@
 import { useEffect, useState } from 'react';
 import { Target, TrendingUp, AlertTriangle, ShieldCheck, ChevronRight, Activity, ArrowRight } from 'lucide-react';
 import { motion } from 'framer-motion';
+import { fetchStudentSection } from '@/lib/studentData';
 
 export default function PredictionCard({ psid }) {
     const [prediction, setPrediction] = useState(null);
@@ -9,8 +10,7 @@ export default function PredictionCard({ psid }) {
 
     useEffect(() => {
         if (!psid) return;
-        fetch(`/api/students/${psid}/prediction.json`)
-            .then(res => res.json())
+        fetchStudentSection(psid, 'prediction')
             .then(data => setPrediction(data))
             .catch(err => console.error("Prediction fetch error", err))
             .finally(() => setLoading(false));
@@ -0,0 +1,69 @@
+"use client";
+import { useEffect, useState } from 'react';
+import { loadTestStats, findStanding } from '@/lib/testStats';
+import { Users } from 'lucide-react';
+
+const SUBJECTS = ['physics', 'chemistry', 'botany', 'zoology'];
+
+// Where the student stands in one test: cohort rank and percentile (computed from the extraction by
+// cohort_stats.py, not the PDF's own columns) next to the cohort median
+export default function TestStandingCard({ psid, test }) {
+    const [stats, setStats] = useState(null);
+    const [standing, setStanding] = useState(null);
+    const normTid = test?.norm_tid;
+
+    useEffect(() => {
+        if (!psid || !normTid) return;
+
+        const fetchData = async () => {
+            try {
+                const [s, st] = await Promise.all([loadTestStats(normTid), findStanding(normTid, psid)]);
+                setStats(s);
+                setStanding(st);
+            } catch (err) {
+                console.error("Failed to load test standing", err);
+            }
+        };
+
+        fetchData();
+    }, [psid, normTid]);
+
+    if (!stats || !standing?.total) return null;
+
+    const median = stats.channels?.total?.quantiles?.p50;
+
+    return (
+        <div className="bg-white p-5 rounded-xl border border-slate-200 shadow-sm mb-8">
+            <div className="flex justify-between items-start mb-4">
+                <div>
+                    <h3 className="text-sm font-bold text-slate-700">Standing in {stats.test_id}</h3>
+                    <p className="text-[10px] text-slate-400">Among {stats.students} students who took this test</p>
+                </div>
+                <div className="p-2 bg-blue-100 text-blue-600 rounded-lg">
+                    <Users size={18} />
+                </div>
+            </div>
+            <div className="flex flex-wrap items-end gap-6">
+                <div>
+                    <div className="text-3xl font-bold text-slate-900">#{standing.total.rank}</div>
+                    <p className="text-xs text-slate-500">{standing.total.percentile} percentile</p>
+                </div>
+                {median !== undefined && (
+                    <div>
+                        <div className="text-lg font-semibold text-slate-700">{test.marks?.total ?? '-'} <span className="text-xs text-slate-400">vs median {median}</span></div>
+                        <p className="text-xs text-slate-500">Total marks</p>
+                    </div>
+                )}
+            </div>
+            <div className="grid grid-cols-2 sm:grid-cols-4 gap-3 mt-4">
+                {SUBJECTS.filter(sub => standing[sub]).map(sub => (
+                    <div key={sub} className="bg-slate-50 rounded-lg p-3">
+                        <p className="text-[10px] font-bold text-slate-400 uppercase tracking-wider capitalize">{sub}</p>
+                        <p className="text-sm font-bold text-slate-900">#{standing[sub].rank}</p>
+                        <p className="text-[10px] text-slate-500">{standing[sub].percentile} pct.</p>
+                    </div>
+                ))}
+            </div>
+        </div>
+    );
+}
@@ -1,6 +1,7 @@
 "use client";
 import React, { createContext, useContext, useState, useEffect } from 'react';
 import { useRouter } from 'next/navigation';
+import { fetchStudentSection } from '@/lib/studentData';
 
 const AuthContext = createContext();
 
@@ -20,9 +21,8 @@ export function AuthProvider({ children }) {
 
     const login = async (psid) => {
         try {
-            const response = await fetch(`/api/students/${psid}/profile.json`);
-            if (response.ok) {
-                const data = await response.json();
+            const data = await fetchStudentSection(psid, 'profile');
+            if (data) {
                 localStorage.setItem('psid', psid);
                 localStorage.setItem('user_data', JSON.stringify(data));
                 setUser(data);
@@ -0,0 +1,42 @@
+// Leaderboard access.
+// Each board is published whole (<id>.json) and paged: <id>/meta.json, <id>/page_<n>.json,
+// plus a key -> [rank, page] index sharded by the key's last two characters (<id>/ranks/<nn>.json).
+// Public boards mask PSIDs, so the key is lookupKey(psid) (leaderboards_v3.lookup_key) and the
+// entry is picked from its page by rank.
+
+const BASE = '/api/leaderboards/public';
+
+export async function loadBoard(boardId, { full = false } = {}) {
+    if (!full) {
+        const metaRes = await fetch(`${BASE}/${boardId}/meta.json`);
+        if (metaRes.ok) {
+            const meta = await metaRes.json();
+            const pageRes = await fetch(`${BASE}/${boardId}/page_1.json`);
+            const page = pageRes.ok ? await pageRes.json() : { entries: [] };
+            return { ...meta, entries: page.entries };
+        }
+    }
+    // Whole board: needed for batch filtering, and for data published before paging
+    const res = await fetch(`${BASE}/${boardId}.json`);
+    return res.json();
+}
+
+// First 16 hex digits of SHA-256(psid)
+async function lookupKey(psid) {
+    const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(psid));
+    return Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, '0')).join('').slice(0, 16);
+}
+
+export async function findBoardEntry(boardId, psid) {
+    if (!psid) return null;
+    const key = await lookupKey(psid);
+    const indexRes = await fetch(`${BASE}/${boardId}/ranks/${key.slice(-2)}.json`);
+    if (!indexRes.ok) return null;
+    const hit = (await indexRes.json())[key];
+    if (!hit) return null;
+    const [rank, page] = hit;
+    const pageRes = await fetch(`${BASE}/${boardId}/page_${page}.json`);
+    if (!pageRes.ok) return null;
+    const data = await pageRes.json();
+    return data.entries.find(e => e.rank === rank) || null;
+}
@@ -0,0 +1,79 @@
+// Per-student dashboard data.
+// evalyx_engine writes every section into one bundle.json per student, so the dashboard
+// needs a single request. The individual files are still published and used as a fallback.
+
+const SECTION_PATHS = {
+    profile: 'profile.json',
+    subject_trends: 'graphs/subject_trends.json',
+    progress_delta: 'graphs/progress_delta.json',
+    consistency: 'analysis/consistency.json',
+    readiness: 'analysis/readiness.json',
+    prediction: 'prediction.json',
+};
+
+const bundleCache = new Map();
+
+export function fetchStudentBundle(psid) {
+    if (!bundleCache.has(psid)) {
+        const request = fetch(`/api/students/${psid}/bundle.json`)
+            .then(res => {
+                if (!res.ok) throw new Error(`bundle.json not available for ${psid}`);
+                return res.json();
+            })
+            .catch(err => {
+                bundleCache.delete(psid);
+                throw err;
+            });
+        bundleCache.set(psid, request);
+    }
+    return bundleCache.get(psid);
+}
+
+export async function fetchStudentSection(psid, section) {
+    try {
+        const bundle = await fetchStudentBundle(psid);
+        if (bundle[section]) return bundle[section];
+    } catch (err) {
+        // Older data without bundle.json: fall back to the per-file path
+    }
+    const res = await fetch(`/api/students/${psid}/${SECTION_PATHS[section]}`);
+    if (!res.ok) return null;
+    return res.json();
+}
+
+// Subject-trend graphs hold x indices into the cohort-wide axes file (graphs/test_axes.json)
+// plus one array of marks per subject. The axes are fetched once and shared by every student;
+// they are refetched when a student's indices run past the cached copy (newer data).
+let axesRequest = null;
+
+function requestAxes(url) {
+    axesRequest = fetch(url)
+        .then(res => {
+            if (!res.ok) throw new Error('graph axes not available');
+            return res.json();
+        })
+        .catch(err => {
+            axesRequest = null;
+            throw err;
+        });
+    return axesRequest;
+}
+
+export async function fetchGraphAxes(trends) {
+    const axes = await (axesRequest || requestAxes(trends.axes));
+    const stale = trends.graphs.some((g, i) => g.x.some(x => x >= (axes.graphs[i]?.values.length ?? 0)));
+    return stale ? requestAxes(`${trends.axes}?t=${Date.now()}`) : axes;
+}
+
+// Back to the { graph_id, title, x_axis, datasets } shape the charts use
+export function expandSubjectTrends(trends, axes) {
+    return trends.graphs.map((g, i) => {
+        const axis = axes.graphs[i];
+        return {
+            graph_id: g.graph_id,
+            title: axis.title,
+            x_axis: { label: axes.x_label, values: g.x.map(x => axis.values[x]) },
+            datasets: g.data.map((data, s) => ({ subject: axes.subjects[s], data })),
+        };
+    });
+}
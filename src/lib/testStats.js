@@ -0,0 +1,34 @@
+// Per-test cohort statistics written by evalyx_engine (cohort_stats.py); shown on the dashboard by
+// components/TestStandingCard.js.
+// tests/index.json lists the tests, tests/<tid>/stats.json holds each channel's count, mean,
+// quantiles and histogram, and tests/<tid>/ranks/<nn>.json (last two PSID digits) holds
+// psid -> [rank, percentile, ...] flattened over the shard's "channels".
+
+const BASE = '/api/tests';
+
+export async function loadTestIndex() {
+    const res = await fetch(`${BASE}/index.json`);
+    if (!res.ok) return { tests: [] };
+    return res.json();
+}
+
+export async function loadTestStats(normTid) {
+    const res = await fetch(`${BASE}/${normTid}/stats.json`);
+    if (!res.ok) return null;
+    return res.json();
+}
+
+// { total: { rank, percentile }, physics: ... } for one student in one test, or null
+export async function findStanding(normTid, psid) {
+    if (!psid) return null;
+    const res = await fetch(`${BASE}/${normTid}/ranks/${psid.slice(-2)}.json`);
+    if (!res.ok) return null;
+    const shard = await res.json();
+    const row = shard.standings[psid];
+    if (!row) return null;
+    const standing = {};
+    shard.channels.forEach((channel, i) => {
+        if (row[2 * i] !== null) standing[channel] = { rank: row[2 * i], percentile: row[2 * i + 1] };
+    });
+    return standing;
+}
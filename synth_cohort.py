@@ -0,0 +1,157 @@
+import os
+import json
+import random
+import argparse
+from datetime import datetime, timedelta
+
+# Synthetic cohort generator for benchmarking the pipeline. Writes an extraction_results.json,
+# test_syllabus.json and manual_names.json with the same shape as the real data (plus empty
+# students/ and leaderboards/ directories) under <out>/public/api, so the scripts can be run
+# with <out> as the working directory. Output is deterministic for a given seed.
+
+SUBJECTS = ["physics", "chemistry", "botany", "zoology"]
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+FIRST_TEST_DATE = datetime(2025, 4, 6)
+DEFAULT_MIX = "FT:0.7,AIATS:0.2,NBTS:0.1"
+CHAPTER_POOL = 60  # chapters per subject the syllabus draws from
+FIRST_NAMES = ["AARAV", "DIYA", "ISHAAN", "KAVYA", "ROHAN", "SNEHA", "VIVAAN", "ANANYA", "ARJUN", "MEERA"]
+LAST_NAMES = ["SHARMA", "VERMA", "GUPTA", "SINGH", "KUMAR", "PATEL", "YADAV", "REDDY", "NAIR", "DAS"]
+
+def parse_mix(mix):
+    parts = []
+    for item in mix.split(","):
+        kind, weight = item.split(":")
+        parts.append((kind.strip().upper(), float(weight)))
+    return parts
+
+def ordinal(day):
+    if 10 <= day % 100 <= 20: return f"{day}th"
+    suffix = {1: 'st', 2: 'nd', 3: 'rd'}.get(day % 10, 'th')
+    return f"{day}{suffix}"
+
+def make_tests(rng, n_tests, mix):
+    # Tests two weeks apart, ids numbered per type (FT-01, AIATS1, NBTS-R1 ...)
+    kinds = [k for k, _ in mix]
+    weights = [w for _, w in mix]
+    counters = {k: 0 for k in kinds}
+    tests = []
+    for i in range(n_tests):
+        kind = rng.choices(kinds, weights)[0]
+        counters[kind] += 1
+        n = counters[kind]
+        date = FIRST_TEST_DATE + timedelta(days=14 * i)
+        test_id = {"FT": f"FT-{n:02d}", "AIATS": f"AIATS{n}", "NBTS": f"NBTS-R{n}"}.get(kind, f"{kind}{n}")
+        tests.append({
+            "test_id": test_id,
+            "test_type": {"AIATS": "AI"}.get(kind, kind),
+            # Syllabus dates in the "2nd July' 25" style of test_syllabus.json
+            "syllabus_date": f"{ordinal(date.day)} {MONTHS[date.month - 1]}' {date.year % 100:02d}",
+            "extraction_date": date.strftime("%d-%m-%Y"),
+        })
+    return tests
+
+def make_syllabus(rng, tests):
+    syllabus = []
+    for t in tests:
+        subjects = {}
+        for sub in SUBJECTS:
+            chapters = [f"{sub.title()} Chapter {c + 1}" for c in sorted(rng.sample(range(CHAPTER_POOL), rng.randint(1, 4)))]
+            subjects[sub] = {"chapters": chapters, "chapter_count": len(chapters)}
+        syllabus.append({"test_id": t["test_id"], "test_type": t["test_type"], "test_date": t["syllabus_date"],
+                         "subjects": subjects})
+    return syllabus
+
+def make_students(rng, n_students, n_batches):
+    students = []
+    psids = rng.sample(range(10**7, 10**8), n_students)
+    for i, psid in enumerate(psids):
+        students.append({
+            "psid": f"000{psid}",
+            "batch": f"RMS{1 + i % n_batches}",
+            "roll_number": f"{36251000000 + i:012d}",
+            # Per-student level and per-subject strengths, so rankings and trends are not pure noise
+            "level": rng.gauss(0.55, 0.15),
+            "subject_bias": [rng.gauss(0, 0.06) for _ in SUBJECTS],
+            "drift": rng.gauss(0, 0.004),
+        })
+    return students
+
+def make_extraction(rng, tests, students, attendance, missing_rate, named_rate):
+    extraction = []
+    for ti, t in enumerate(tests):
+        rows = []
+        for s in students:
+            if rng.random() > attendance: continue
+            marks = {}
+            for si, sub in enumerate(SUBJECTS):
+                if rng.random() < missing_rate: continue
+                p = s["level"] + s["subject_bias"][si] + s["drift"] * ti + rng.gauss(0, 0.08)
+                marks[sub] = max(-20, min(180, int(round(180 * p))))
+            marks["total"] = sum(marks.values())
+            rows.append({
+                "psid": s["psid"],
+                "name": None if rng.random() > named_rate else f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                "batch": s["batch"],
+                "roll_number": s["roll_number"],
+                "marks": marks,
+            })
+        rows.sort(key=lambda r: -r["marks"]["total"])
+        for rank, r in enumerate(rows, 1):
+            r["sno"] = rank
+            r["center rank"] = rank
+            r["air rank"] = 0
+            r["percentile"] = round(100.0 * (len(rows) - rank) / max(len(rows), 1), 2)
+        # Same key order as the real extraction
+        order = ["sno", "psid", "name", "batch", "roll_number", "marks", "center rank", "air rank", "percentile"]
+        extraction.append({
+            "test_id": t["test_id"],
+            "test_type": t["test_type"],
+            "test_date": t["extraction_date"],
+            "students": [{k: r[k] for k in order} for r in rows],
+        })
+    return extraction
+
+def make_manual_names(rng, students, rate):
+    return {s["psid"]: f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            for s in students if rng.random() < rate}
+
+def generate(out_dir, n_students=1000, n_tests=13, mix=DEFAULT_MIX, attendance=0.85, missing_rate=0.01,
+             named_rate=0.3, manual_rate=0.02, n_batches=8, seed=0):
+    rng = random.Random(seed)
+    api_dir = os.path.join(out_dir, 'public', 'api')
+    for d in ('students', os.path.join('leaderboards', 'public'), os.path.join('leaderboards', 'private')):
+        os.makedirs(os.path.join(api_dir, d), exist_ok=True)
+
+    tests = make_tests(rng, n_tests, parse_mix(mix))
+    students = make_students(rng, n_students, n_batches)
+    files = {
+        'test_syllabus.json': make_syllabus(rng, tests),
+        'extraction_results.json': make_extraction(rng, tests, students, attendance, missing_rate, named_rate),
+        'manual_names.json': make_manual_names(rng, students, manual_rate),
+    }
+    for name, data in files.items():
+        with open(os.path.join(api_dir, name), 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+    return {"students": n_students, "tests": n_tests, "mix": mix, "attendance": attendance,
+            "missing_rate": missing_rate, "seed": seed,
+            "rows": sum(len(t["students"]) for t in files['extraction_results.json'])}
+
+def add_cohort_args(parser):
+    parser.add_argument("--students", type=int, default=1000, help="cohort size (1k to 200k)")
+    parser.add_argument("--tests", type=int, default=13, help="number of tests (10 to 100)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="test type weights, e.g. FT:0.7,AIATS:0.2,NBTS:0.1")
+    parser.add_argument("--attendance", type=float, default=0.85, help="chance a student sits a given test")
+    parser.add_argument("--missing-rate", type=float, default=0.01, help="chance a subject mark is missing")
+    parser.add_argument("--seed", type=int, default=0)
+
+def cohort_from_args(args):
+    return {"n_students": args.students, "n_tests": args.tests, "mix": args.mix,
+            "attendance": args.attendance, "missing_rate": args.missing_rate, "seed": args.seed}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic cohort for benchmarking")
+    parser.add_argument("out_dir", help="directory to create public/api in")
+    add_cohort_args(parser)
+    args = parser.parse_args()
+    info = generate(args.out_dir, **cohort_from_args(args))
+    print(f"Generated {info['students']} students, {info['tests']} tests, {info['rows']} result rows in {args.out_dir}")
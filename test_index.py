@@ -0,0 +1,103 @@
+import os
+import re
+import json
+import pickle
+import hashlib
+from functools import lru_cache
+from datetime import datetime
+
+from output_writer import write_atomic
+
+# Test-ID normalization and the syllabus index shared by evalyx_engine, admin_ingest and the
+# SQLite backend. Each distinct test ID / syllabus date string is parsed once per process, and
+# the compiled index (syllabus_map, test_dates, test_order) is kept in a pickle that is reused
+# until test_syllabus.json changes (same mtime and size, or failing that the same content hash).
+SYLLABUS_FILE = os.path.join('public', 'api', 'test_syllabus.json')
+INDEX_CACHE = os.path.join('data', 'syllabus_index.pickle')
+# Bump when normalize_tid / parse_syllabus_date change so cached indexes are rebuilt
+INDEX_VERSION = 1
+
+DEFAULT_DATE = datetime(1900, 1, 1)
+PREFIX_RE = re.compile(r"([A-Z]+)")
+NUMBER_RE = re.compile(r"(\d+)")
+ORDINAL_RE = re.compile(r"(\d+)(st|nd|rd|th)")
+DATE_FORMATS = ["%d %b %y", "%d %B %y"]
+
+def prefix_fix(p):
+    if p == "NBTSR": return "NBTS"
+    return p
+
+@lru_cache(maxsize=None)
+def _normalize(tid):
+    tid = tid.upper()
+    pm = PREFIX_RE.search(tid)
+    nm = NUMBER_RE.search(tid)
+    if pm and nm:
+        p = pm.group(1)
+        n = int(nm.group(1))
+        return f"{prefix_fix(p)}{n}"
+    return tid.replace("-", "").replace("_", "").replace(" ", "")
+
+def normalize_tid(tid):
+    if not tid: return ""
+    return _normalize(str(tid))
+
+@lru_cache(maxsize=None)
+def _parse_date(date_str):
+    clean = ORDINAL_RE.sub(r"\1", date_str)
+    clean = clean.replace("'", " ").replace(".", " ").replace("  ", " ")
+    for fmt in DATE_FORMATS:
+        try: return datetime.strptime(clean.strip(), fmt)
+        except ValueError: continue
+    return DEFAULT_DATE
+
+def parse_syllabus_date(date_str):
+    if not date_str or not isinstance(date_str, str): return DEFAULT_DATE
+    return _parse_date(date_str)
+
+def build_index(syllabus_list):
+    syllabus_map = {}
+    test_dates = {}
+    test_order = {}
+    for i, t in enumerate(syllabus_list):
+        ntid = normalize_tid(t['test_id'])
+        syllabus_map[ntid] = t['subjects']
+        test_dates[ntid] = parse_syllabus_date(t['test_date'])
+        test_order[ntid] = i
+    return syllabus_map, test_dates, test_order
+
+def _read_cache(cache_path):
+    try:
+        with open(cache_path, 'rb') as f:
+            cached = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        return None
+    if not isinstance(cached, dict) or cached.get("version") != INDEX_VERSION: return None
+    return cached
+
+def _write_cache(cache_path, cached):
+    out_dir = os.path.dirname(cache_path)
+    try:
+        if out_dir: os.makedirs(out_dir, exist_ok=True)
+        write_atomic(cache_path, pickle.dumps(cached, protocol=pickle.HIGHEST_PROTOCOL))
+    except OSError:
+        pass  # the cache is only an optimization
+
+def load_syllabus(path=SYLLABUS_FILE, cache_path=INDEX_CACHE):
+    # Returns (syllabus_map, test_dates, test_order) keyed by normalized test ID
+    st = os.stat(path)
+    cached = _read_cache(cache_path) if cache_path else None
+    if cached and cached["source"] == path and cached["mtime_ns"] == st.st_mtime_ns and cached["size"] == st.st_size:
+        return cached["index"]
+
+    with open(path, 'rb') as f:
+        raw = f.read()
+    digest = hashlib.sha1(raw).hexdigest()
+    if cached and cached["source"] == path and cached["sha1"] == digest:
+        index = cached["index"]  # touched but unchanged
+    else:
+        index = build_index(json.loads(raw))
+    if cache_path:
+        _write_cache(cache_path, {"version": INDEX_VERSION, "source": path, "mtime_ns": st.st_mtime_ns,
+                                  "size": st.st_size, "sha1": digest, "index": index})
+    return index